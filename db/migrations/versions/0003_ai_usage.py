@@ -0,0 +1,43 @@
+"""Add ai_usage table for per-org AI token/cost accounting
+
+Revision ID: 0003_ai_usage
+Revises: 0002_add_stripe_fields
+Create Date: 2026-10-19 00:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0003_ai_usage"
+down_revision = "0002_add_stripe_fields"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "ai_usage",
+        sa.Column("id", sa.BigInteger, primary_key=True),
+        sa.Column("org_id", sa.Integer, sa.ForeignKey("orgs.id"), nullable=True),
+        sa.Column("job_id", sa.BigInteger, nullable=True),
+        sa.Column("route", sa.String, nullable=True),
+        sa.Column("model", sa.String, nullable=False),
+        sa.Column("window_start", sa.DateTime, nullable=False),
+        sa.Column("calls", sa.Integer, nullable=False, server_default="0"),
+        sa.Column("errors", sa.Integer, nullable=False, server_default="0"),
+        sa.Column("input_tokens", sa.BigInteger, nullable=False, server_default="0"),
+        sa.Column("output_tokens", sa.BigInteger, nullable=False, server_default="0"),
+        sa.Column("images", sa.Integer, nullable=False, server_default="0"),
+        sa.Column("latency_ms", sa.BigInteger, nullable=False, server_default="0"),
+        sa.Column("cost_usd", sa.Float, nullable=False, server_default="0"),
+    )
+    op.create_index("ix_ai_usage_org_id", "ai_usage", ["org_id"])
+    op.create_index("ix_ai_usage_window_start", "ai_usage", ["window_start"])
+
+
+def downgrade():
+    op.drop_index("ix_ai_usage_window_start", table_name="ai_usage")
+    op.drop_index("ix_ai_usage_org_id", table_name="ai_usage")
+    op.drop_table("ai_usage")
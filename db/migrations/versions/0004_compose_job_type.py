@@ -0,0 +1,26 @@
+"""Add 'compose' job type for async /nlp/compose
+
+Revision ID: 0004_compose_job_type
+Revises: 0003_ai_usage
+Create Date: 2026-10-19 00:00:00.000000
+"""
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "0004_compose_job_type"
+down_revision = "0003_ai_usage"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # ALTER TYPE ... ADD VALUE can't run inside a transaction block
+    with op.get_context().autocommit_block():
+        op.execute("ALTER TYPE jobtype ADD VALUE IF NOT EXISTS 'compose'")
+
+
+def downgrade():
+    # Postgres can't drop an enum value; an unused 'compose' label is harmless
+    pass
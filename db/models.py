@@ -9,12 +9,17 @@ from sqlalchemy import (
     ForeignKey,
     JSON,
     BigInteger,
+    Float,
 )
 from sqlalchemy.orm import declarative_base, relationship
 import enum
 
 Base = declarative_base()
 
+def _pg_enum(enum_cls, name):
+    """Enum column bound by member value, matching the lowercase labels the migrations create"""
+    return Enum(enum_cls, name=name, values_callable=lambda e: [m.value for m in e])
+
 class Plan(enum.Enum):
     BASIC = "basic"
     PRO = "pro"
@@ -31,6 +36,7 @@ class JobType(enum.Enum):
     STAGING = "staging"
     CAPTION = "caption"
     PUBLISH = "publish"
+    COMPOSE = "compose"
 
 class JobStatus(enum.Enum):
     CREATED = "created"
@@ -43,7 +49,7 @@ class Org(Base):
     __tablename__ = "orgs"
     id = Column(Integer, primary_key=True)
     name = Column(String, nullable=False)
-    plan = Column(Enum(Plan), nullable=False)
+    plan = Column(_pg_enum(Plan, "plan"), nullable=False)
     weekly_limit = Column(Integer, nullable=False, default=2)
     status = Column(String, default="active")
     stripe_customer_id = Column(String, unique=True)
@@ -65,7 +71,7 @@ class Asset(Base):
     id = Column(Integer, primary_key=True)
     org_id = Column(Integer, ForeignKey("orgs.id"), nullable=False)
     owner_user_id = Column(Integer, ForeignKey("users.id"))
-    kind = Column(Enum(AssetKind), nullable=False)
+    kind = Column(_pg_enum(AssetKind, "assetkind"), nullable=False)
     gcs_uri = Column(String, nullable=False)
     width = Column(Integer)
     height = Column(Integer)
@@ -79,9 +85,9 @@ class Job(Base):
     id = Column(BigInteger, primary_key=True)
     org_id = Column(Integer, ForeignKey("orgs.id"), nullable=False)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    type = Column(Enum(JobType), nullable=False)
+    type = Column(_pg_enum(JobType, "jobtype"), nullable=False)
     input_asset_ids = Column(JSON, default=list)
-    status = Column(Enum(JobStatus), default=JobStatus.CREATED)
+    status = Column(_pg_enum(JobStatus, "jobstatus"), default=JobStatus.CREATED)
     model = Column(String)
     params = Column(JSON, default=dict)
     output_asset_ids = Column(JSON, default=list)
@@ -109,3 +115,20 @@ class Quota(Base):
     window_end = Column(DateTime, nullable=False)
     weekly_limit = Column(Integer, nullable=False, default=2)
     used_count = Column(Integer, default=0)
+
+class AIUsage(Base):
+    """Per-minute AI call aggregates, flushed in batches by services.worker.ai.usage"""
+    __tablename__ = "ai_usage"
+    id = Column(BigInteger, primary_key=True)
+    org_id = Column(Integer, ForeignKey("orgs.id"), index=True)
+    job_id = Column(BigInteger)
+    route = Column(String)
+    model = Column(String, nullable=False)
+    window_start = Column(DateTime, nullable=False, index=True)
+    calls = Column(Integer, nullable=False, default=0)
+    errors = Column(Integer, nullable=False, default=0)
+    input_tokens = Column(BigInteger, nullable=False, default=0)
+    output_tokens = Column(BigInteger, nullable=False, default=0)
+    images = Column(Integer, nullable=False, default=0)
+    latency_ms = Column(BigInteger, nullable=False, default=0)
+    cost_usd = Column(Float, nullable=False, default=0.0)
@@ -0,0 +1,136 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from packages.common.config import (
+    AI_CACHE_ENABLED,
+    AI_CACHE_PATH,
+    AI_CACHE_MAX_ENTRIES,
+    AI_CACHE_TTL_SECONDS,
+)
+
+_cache = None
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Collapse whitespace so trivially different prompts share a key.
+
+    Case is kept: it reaches the model (names, addresses, acronyms) and shapes the output.
+    """
+    return " ".join(str(prompt).split())
+
+
+def make_key(model_id: str, prompt: str, config: dict | None = None) -> str:
+    raw = json.dumps(
+        {"model": model_id, "prompt": normalize_prompt(prompt), "config": config or {}},
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """Two-tier cache for model responses: in-memory LRU in front of a SQLite file.
+
+    Values must be JSON-serializable. Both tiers hold the serialized JSON and every
+    get() decodes a fresh copy, so callers can mutate what they get (or set) without
+    touching the cached entry. Pass path="" to keep the cache in memory only.
+    """
+
+    def __init__(self, path: str = "", max_entries: int = 1024, ttl_seconds: int = 86400):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()  # key -> (expires_at, JSON text)
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "sets": 0, "expired": 0}
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+
+    def get(self, key: str):
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                expires_at, raw = entry
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    self._stats["memory_hits"] += 1
+                    return json.loads(raw)
+                del self._memory[key]
+                self._stats["expired"] += 1
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, expires_at FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    if row[1] > now:
+                        self._remember(key, row[1], row[0])
+                        self._stats["disk_hits"] += 1
+                        return json.loads(row[0])
+                    self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._stats["expired"] += 1
+
+            self._stats["misses"] += 1
+            return None
+
+    def set(self, key: str, value, ttl_seconds: int | None = None) -> None:
+        expires_at = time.time() + (self.ttl_seconds if ttl_seconds is None else ttl_seconds)
+        raw = json.dumps(value)
+        with self._lock:
+            self._remember(key, expires_at, raw)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses (key, value, expires_at) VALUES (?, ?, ?)",
+                    (key, raw, expires_at),
+                )
+            self._stats["sets"] += 1
+
+    def purge_expired(self) -> int:
+        """Drop expired rows from both tiers; returns the number of disk rows removed"""
+        now = time.time()
+        with self._lock:
+            for key in [k for k, (exp, _) in self._memory.items() if exp <= now]:
+                del self._memory[key]
+            if self._db is None:
+                return 0
+            return self._db.execute("DELETE FROM responses WHERE expires_at <= ?", (now,)).rowcount
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM responses")
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["memory_entries"] = len(self._memory)
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["memory_hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+        return stats
+
+    def _remember(self, key: str, expires_at: float, raw: str) -> None:
+        self._memory[key] = (expires_at, raw)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+
+def response_cache() -> ResponseCache | None:
+    """Process-wide cache for AI text responses (None when AI_CACHE_ENABLED=0)"""
+    global _cache
+    if not AI_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        _cache = ResponseCache(AI_CACHE_PATH, AI_CACHE_MAX_ENTRIES, AI_CACHE_TTL_SECONDS)
+    return _cache
@@ -0,0 +1,22 @@
+# Caption length targets per platform: (target min, hard max) in characters
+PLATFORM_LIMITS = {
+    "instagram": (180, 220),
+    "x": (100, 280),
+    "tiktok": (60, 150),
+}
+
+STAGED_DISCLOSURE = "One or more photos are virtually staged."
+
+
+def fit_caption(text: str, platform: str, staged: bool = False) -> str:
+    """Trim a caption to the platform's hard limit, keeping the staging disclosure intact"""
+    limit = PLATFORM_LIMITS[platform][1]
+    body = " ".join(text.replace(STAGED_DISCLOSURE, " ").split()) if staged else " ".join(text.split())
+    if staged:
+        limit -= len(STAGED_DISCLOSURE) + 1
+    if len(body) > limit:
+        cut = body[: limit - 1]
+        if " " in cut:
+            cut = cut[: cut.rfind(" ")]
+        body = cut.rstrip(" ,.;:-—") + "…"
+    return f"{body} {STAGED_DISCLOSURE}" if staged else body
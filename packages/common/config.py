@@ -16,8 +16,95 @@ MOCK_AI = env("MOCK_AI", "1") == "1"
 GEMINI_IMAGE_MODEL_ID = env("GEMINI_IMAGE_MODEL_ID", "gemini-1.5-flash-002")
 GEMINI_TEXT_MODEL_ID = env("GEMINI_TEXT_MODEL_ID", "gemini-2.5-flash")
 IMAGEN_MODEL_ID = env("IMAGEN_MODEL_ID", "imagen-3.0")
+IMAGEN_EDIT_MODEL_ID = env("IMAGEN_EDIT_MODEL_ID", "imagen-3.0-generate-001")
+AI_COALESCE_ENABLED = env("AI_COALESCE_ENABLED", "1") == "1"
+# "mock" (instant canned output), "vertex", or "sim" (offline Vertex-like latency/quota/faults)
+AI_BACKEND = env("AI_BACKEND", "mock" if MOCK_AI else "vertex")
+
+# Downscale image inputs to each model's effective resolution before upload
+AI_INPUT_DOWNSCALE_ENABLED = env("AI_INPUT_DOWNSCALE_ENABLED", "1") == "1"
+AI_INPUT_MAX_EDGE = env("AI_INPUT_MAX_EDGE", "")  # "imagen=1536,gemini=2048" (model id prefix = px)
+AI_INPUT_CACHE_MB = env("AI_INPUT_CACHE_MB", "64", int)
+
+# Pass gs:// references to Vertex instead of downloading and re-uploading the bytes,
+# for objects in buckets the Vertex service agent can read that are small enough to
+# skip local downscaling
+AI_INPUT_BY_URI = env("AI_INPUT_BY_URI", "1") == "1"
+AI_URI_BUCKETS = env("AI_URI_BUCKETS", f"{BUCKET_RAW},{BUCKET_PROCESSED}")
+AI_URI_MAX_BYTES = env("AI_URI_MAX_BYTES", str(2 * 1024 * 1024), int)
+
+# External source images for smart edits (pooled, size-guarded, cached with revalidation)
+FETCH_MAX_BYTES = env("FETCH_MAX_BYTES", str(20 * 1024 * 1024), int)
+FETCH_TIMEOUT_SECONDS = env("FETCH_TIMEOUT_SECONDS", "15", float)
+FETCH_CACHE_MB = env("FETCH_CACHE_MB", "128", int)
+FETCH_FRESH_SECONDS = env("FETCH_FRESH_SECONDS", "300", float)
+FETCH_MAX_CONNECTIONS = env("FETCH_MAX_CONNECTIONS", "20", int)
+
+# Low-resolution WebP preview published on the job before the full-resolution outputs
+PREVIEW_ENABLED = env("PREVIEW_ENABLED", "1") == "1"
+PREVIEW_MAX_EDGE = env("PREVIEW_MAX_EDGE", "480", int)
+PREVIEW_QUALITY = env("PREVIEW_QUALITY", "60", int)
+
+# Prometheus /metrics on the API and worker
+METRICS_ENABLED = env("METRICS_ENABLED", "1") == "1"
+
+# OpenTelemetry tracing: "" (off), "console", "memory" or "otlp" (see packages/common/tracing.py)
+TRACING_EXPORTER = env("TRACING_EXPORTER", "")
+TRACING_SAMPLE_RATIO = env("TRACING_SAMPLE_RATIO", "1", float)
+TRACING_SERVICE_NAME = env("OTEL_SERVICE_NAME", "recontent")
+
+# Per-job CPU/memory accounting in the worker (tracemalloc adds some allocation overhead)
+JOB_TRACEMALLOC = env("JOB_TRACEMALLOC", "0") == "1"
+JOB_METER_INTERVAL_MS = env("JOB_METER_INTERVAL_MS", "20", float)
+
+# Admin-only endpoints (/admin/profile/*); unset = the routes answer 404
+ADMIN_TOKEN = env("ADMIN_TOKEN", "")
+
+# Record/replay of AI client calls for reproducible benchmarks
+AI_CASSETTE_MODE = env("AI_CASSETTE_MODE", "")  # "" (off), "record" or "replay"
+AI_CASSETTE_DIR = env("AI_CASSETTE_DIR", "cassettes/default")
+AI_CASSETTE_REALTIME = env("AI_CASSETTE_REALTIME", "1") == "1"  # replay with the recorded latency
+
+# Simulated backend (AI_BACKEND=sim), for load and capacity testing
+AI_SIM_SEED = env("AI_SIM_SEED", "0", int)
+AI_SIM_PROFILE_JSON = env("AI_SIM_PROFILE_JSON", "")  # {"composite": {"p50": 14, "p95": 35, "error_rate": 0.03}}
+AI_SIM_QPM = env("AI_SIM_QPM", "0", float)  # simulated server-side quota per model; 0 = unlimited
+AI_SIM_TIME_SCALE = env("AI_SIM_TIME_SCALE", "1", float)  # 0.1 = ten times faster than Vertex
+AI_SIM_IMAGE_SIZE = env("AI_SIM_IMAGE_SIZE", "1024x1024", lambda s: tuple(int(x) for x in s.lower().split("x")))
+
+# Client-side admission control for Vertex quota (per model id, per process)
+AI_LIMIT_QPM = env("AI_LIMIT_QPM", "60", float)
+AI_LIMIT_QPM_OVERRIDES = env("AI_LIMIT_QPM_OVERRIDES", "")  # "model-id=300,other-model=20"
+AI_LIMIT_BURST = env("AI_LIMIT_BURST", "5", float)
+AI_LIMIT_MIN_CONCURRENCY = env("AI_LIMIT_MIN_CONCURRENCY", "1", int)
+AI_LIMIT_MAX_CONCURRENCY = env("AI_LIMIT_MAX_CONCURRENCY", "8", int)
+AI_LIMIT_LATENCY_TARGET_SECONDS = env("AI_LIMIT_LATENCY_TARGET_SECONDS", "20", float)
+AI_LIMIT_MAX_WAIT_SECONDS = env("AI_LIMIT_MAX_WAIT_SECONDS", "30", float)
+
+# Deadlines, hedging and circuit breaking for model calls
+API_REQUEST_BUDGET_SECONDS = env("API_REQUEST_BUDGET_SECONDS", "120", float)
+JOB_BUDGET_SECONDS = env("JOB_BUDGET_SECONDS", "540", float)
+AI_CALL_TIMEOUT_SECONDS = env("AI_CALL_TIMEOUT_SECONDS", "90", float)
+AI_HEDGE_ENABLED = env("AI_HEDGE_ENABLED", "1") == "1"
+AI_HEDGE_MIN_SAMPLES = env("AI_HEDGE_MIN_SAMPLES", "20", int)
+AI_BREAKER_FAILURE_THRESHOLD = env("AI_BREAKER_FAILURE_THRESHOLD", "5", int)
+AI_BREAKER_RESET_SECONDS = env("AI_BREAKER_RESET_SECONDS", "30", float)
+
+# Smart edits: one structured Gemini call for edit analysis + marketing copy
+AI_COMBINED_SMART_EDIT = env("AI_COMBINED_SMART_EDIT", "1") == "1"
+
+# Per-org AI token/cost accounting (ai_usage table)
+AI_USAGE_ENABLED = env("AI_USAGE_ENABLED", "1") == "1"
+AI_USAGE_FLUSH_SECONDS = env("AI_USAGE_FLUSH_SECONDS", "30", float)
+AI_USAGE_MAX_PENDING = env("AI_USAGE_MAX_PENDING", "10000", int)
+AI_PRICING_JSON = env("AI_PRICING_JSON", "")
 
 DB_INSTANCE_CONN_NAME = env("DB_INSTANCE_CONN_NAME", "recontent-472506:us-central1:recontent-sql")
 DB_NAME = env("DB_NAME", "recontent")
 DB_USER = env("DB_USER", "recontent")
 DB_PASSWORD = os.getenv("DB_PASSWORD", "")  # allow empty in local MOCK
+
+AI_CACHE_ENABLED = env("AI_CACHE_ENABLED", "1") == "1"
+AI_CACHE_PATH = env("AI_CACHE_PATH", "/tmp/recontent-ai-cache.sqlite3")  # "" = memory only
+AI_CACHE_MAX_ENTRIES = env("AI_CACHE_MAX_ENTRIES", "1024", int)
+AI_CACHE_TTL_SECONDS = env("AI_CACHE_TTL_SECONDS", "86400", int)
@@ -1,14 +1,29 @@
 from PIL import Image, ImageOps
 from io import BytesIO
+from packages.common import timing
 
 SIZES = [(1080, 1080), (1080, 1350), (1080, 1920)]
 
-def social_crops(img_bytes: bytes) -> list[bytes]:
-    im = Image.open(BytesIO(img_bytes)).convert("RGB")
-    outs = []
+def iter_social_crops(img_bytes: bytes):
+    """Yield each social crop as encoded JPEG bytes, one at a time.
+
+    Only the decoded source and the crop being encoded are held; the caller can
+    upload and drop each crop before the next one is made.
+    """
+    with timing.stage("decode"):
+        im = Image.open(BytesIO(img_bytes))
+        # convert() always copies; skipping it for RGB sources avoids a second full-size buffer
+        im = im.convert("RGB") if im.mode != "RGB" else im
+        im.load()
+    del img_bytes
     for w, h in SIZES:
-        c = ImageOps.fit(im, (w, h), method=Image.Resampling.LANCZOS)
-        b = BytesIO()
-        c.save(b, format="JPEG", quality=92)
-        outs.append(b.getvalue())
-    return outs
+        with timing.stage("crop"):
+            c = ImageOps.fit(im, (w, h), method=Image.Resampling.LANCZOS)
+        with timing.stage("encode"):
+            b = BytesIO()
+            c.save(b, format="JPEG", quality=92)
+        del c
+        yield b.getvalue()
+
+def social_crops(img_bytes: bytes) -> list[bytes]:
+    return list(iter_social_crops(img_bytes))
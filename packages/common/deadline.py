@@ -0,0 +1,59 @@
+import contextvars
+import time
+from contextlib import contextmanager
+
+# Absolute wall-clock deadline (epoch seconds) for the current request or job.
+# Wall-clock rather than monotonic so it survives the hop through Pub/Sub.
+_deadline = contextvars.ContextVar("deadline", default=None)
+
+DEADLINE_HEADER = "X-Request-Deadline"  # epoch seconds
+TIMEOUT_HEADER = "X-Request-Timeout"  # seconds from now
+
+
+class DeadlineExceeded(TimeoutError):
+    pass
+
+
+def current() -> float | None:
+    return _deadline.get()
+
+
+def remaining(default: float | None = None) -> float | None:
+    """Seconds left in the current budget, or `default` when no deadline is set"""
+    deadline = _deadline.get()
+    if deadline is None:
+        return default
+    return deadline - time.time()
+
+
+def timeout_for(cap: float) -> float:
+    """Timeout for one downstream call: the remaining budget, capped at `cap`"""
+    left = remaining()
+    if left is None:
+        return cap
+    if left <= 0:
+        raise DeadlineExceeded("request deadline already passed")
+    return min(cap, left)
+
+
+@contextmanager
+def budget(seconds: float | None = None, until: float | None = None):
+    """Run the block under a deadline. A tighter enclosing deadline always wins."""
+    candidates = [d for d in (_deadline.get(), until, time.time() + seconds if seconds else None) if d]
+    token = _deadline.set(min(candidates) if candidates else None)
+    try:
+        yield _deadline.get()
+    finally:
+        _deadline.reset(token)
+
+
+def from_headers(headers) -> float | None:
+    """Absolute deadline requested by the caller, if any"""
+    try:
+        if headers.get(DEADLINE_HEADER):
+            return float(headers[DEADLINE_HEADER])
+        if headers.get(TIMEOUT_HEADER):
+            return time.time() + float(headers[TIMEOUT_HEADER])
+    except ValueError:
+        pass
+    return None
@@ -0,0 +1,140 @@
+import asyncio
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from packages.common import deadline
+from packages.common.config import (
+    FETCH_MAX_BYTES,
+    FETCH_TIMEOUT_SECONDS,
+    FETCH_CACHE_MB,
+    FETCH_FRESH_SECONDS,
+    FETCH_MAX_CONNECTIONS,
+)
+from packages.common.logging import get_logger
+
+log = get_logger("fetch")
+
+IMAGE_TYPES = ("image/jpeg", "image/png", "image/webp")
+
+_client = None
+_cache = OrderedDict()  # url -> CachedImage
+_cache_bytes = 0
+_stats = {"hits": 0, "revalidated": 0, "fetched": 0, "rejected": 0}
+
+
+class FetchError(ValueError):
+    """The source can't be used: HTTP error, wrong content type or too large"""
+
+
+@dataclass
+class CachedImage:
+    body: bytes
+    content_type: str
+    etag: str | None
+    last_modified: str | None
+    fresh_until: float
+
+
+def client():
+    """Shared async HTTP client; keeps connections to image hosts alive between requests"""
+    global _client
+    if _client is None:
+        import httpx  # deferred: only smart edits from external URLs need it
+
+        _client = httpx.AsyncClient(
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=FETCH_MAX_CONNECTIONS, max_keepalive_connections=FETCH_MAX_CONNECTIONS),
+            headers={"User-Agent": "recontent-fetch/1.0"},
+        )
+    return _client
+
+
+async def aclose() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+async def fetch_image(url: str) -> bytes:
+    """Image bytes for an http(s) URL, served from cache while fresh and revalidated after"""
+    import httpx
+
+    cached = _cache.get(url)
+    if cached is not None and cached.fresh_until > time.time():
+        _cache.move_to_end(url)
+        _stats["hits"] += 1
+        return cached.body
+
+    headers = {}
+    if cached is not None:
+        if cached.etag:
+            headers["If-None-Match"] = cached.etag
+        if cached.last_modified:
+            headers["If-Modified-Since"] = cached.last_modified
+
+    timeout = deadline.timeout_for(FETCH_TIMEOUT_SECONDS)
+    try:
+        async with client().stream("GET", url, headers=headers, timeout=timeout) as resp:
+            if resp.status_code == 304 and cached is not None:
+                cached.fresh_until = time.time() + _max_age(resp.headers)
+                _cache.move_to_end(url)
+                _stats["revalidated"] += 1
+                return cached.body
+            if resp.status_code >= 400:
+                raise FetchError(f"{url} returned HTTP {resp.status_code}")
+            content_type = resp.headers.get("Content-Type", "").split(";")[0].strip().lower()
+            if content_type not in IMAGE_TYPES:
+                raise FetchError(f"{url} is {content_type or 'untyped'}, not a supported image")
+            if int(resp.headers.get("Content-Length") or 0) > FETCH_MAX_BYTES:
+                raise FetchError(f"{url} is larger than {FETCH_MAX_BYTES} bytes")
+            chunks, size = [], 0
+            async for chunk in resp.aiter_bytes():
+                size += len(chunk)
+                if size > FETCH_MAX_BYTES:
+                    raise FetchError(f"{url} is larger than {FETCH_MAX_BYTES} bytes")
+                chunks.append(chunk)
+            body = b"".join(chunks)
+            _stats["fetched"] += 1
+            if "no-store" not in resp.headers.get("Cache-Control", ""):
+                _store(url, CachedImage(
+                    body=body,
+                    content_type=content_type,
+                    etag=resp.headers.get("ETag"),
+                    last_modified=resp.headers.get("Last-Modified"),
+                    fresh_until=time.time() + _max_age(resp.headers),
+                ))
+            return body
+    except FetchError:
+        _stats["rejected"] += 1
+        raise
+    except (httpx.TimeoutException, asyncio.TimeoutError) as e:
+        raise deadline.DeadlineExceeded(f"fetching {url} timed out") from e
+
+
+def _max_age(headers) -> float:
+    match = re.search(r"max-age=(\d+)", headers.get("Cache-Control", ""))
+    if match:
+        return min(float(match.group(1)), FETCH_FRESH_SECONDS)
+    return FETCH_FRESH_SECONDS
+
+
+def _store(url: str, entry: CachedImage) -> None:
+    global _cache_bytes
+    budget = FETCH_CACHE_MB * 1024 * 1024
+    if len(entry.body) > budget:
+        return
+    previous = _cache.pop(url, None)
+    if previous is not None:
+        _cache_bytes -= len(previous.body)
+    _cache[url] = entry
+    _cache_bytes += len(entry.body)
+    while _cache_bytes > budget:
+        _, evicted = _cache.popitem(last=False)
+        _cache_bytes -= len(evicted.body)
+
+
+def stats() -> dict:
+    return {**_stats, "entries": len(_cache), "bytes": _cache_bytes}
@@ -1,10 +1,11 @@
-from google.cloud import storage
+from packages.common import metrics, tracing
 
 _client = None
 
 def client():
     global _client
     if not _client:
+        from google.cloud import storage  # deferred: heavy import, only needed on first GCS call
         _client = storage.Client()
     return _client
 
@@ -16,7 +17,23 @@ def download_bytes(gcs_uri: str) -> bytes:
     bucket_name = parts[0]
     blob_path = parts[1] if len(parts) > 1 else ""
     blob = client().bucket(bucket_name).blob(blob_path)
-    return blob.download_as_bytes()
+    with tracing.span("gcs.download", kind="client", **{"gcs.bucket": bucket_name}):
+        data = blob.download_as_bytes()
+        tracing.annotate(**{"gcs.bytes": len(data)})
+    metrics.count_gcs_bytes("download", len(data))
+    return data
+
+def stat(gcs_uri: str) -> dict | None:
+    """Size and content type of an object (metadata only), or None if it doesn't exist"""
+    uri_without_prefix = gcs_uri.replace("gs://", "")
+    parts = uri_without_prefix.split("/", 1)  # Split into bucket and path
+    bucket_name = parts[0]
+    blob_path = parts[1] if len(parts) > 1 else ""
+    with tracing.span("gcs.stat", kind="client", **{"gcs.bucket": bucket_name}):
+        blob = client().bucket(bucket_name).get_blob(blob_path)
+    if blob is None:
+        return None
+    return {"size": blob.size, "content_type": blob.content_type}
 
 def upload_bytes(gcs_uri: str, data: bytes, content_type="image/jpeg"):
     # Parse gs://bucket-name/path/to/file.jpg
@@ -25,7 +42,9 @@ def upload_bytes(gcs_uri: str, data: bytes, content_type="image/jpeg"):
     bucket_name = parts[0]
     blob_path = parts[1] if len(parts) > 1 else ""
     blob = client().bucket(bucket_name).blob(blob_path)
-    blob.upload_from_string(data, content_type=content_type)
+    with tracing.span("gcs.upload", kind="client", **{"gcs.bucket": bucket_name, "gcs.bytes": len(data)}):
+        blob.upload_from_string(data, content_type=content_type)
+    metrics.count_gcs_bytes("upload", len(data))
     return gcs_uri
 
 def get_signed_url(gcs_uri: str, expiration_minutes: int = 60) -> str:
@@ -43,9 +62,10 @@ def get_signed_url(gcs_uri: str, expiration_minutes: int = 60) -> str:
     # Generate signed URL with expiration
     expiration_time = datetime.utcnow() + timedelta(minutes=expiration_minutes)
     
-    signed_url = blob.generate_signed_url(
-        expiration=expiration_time,
-        method="GET"
-    )
+    with tracing.span("gcs.sign", kind="client", **{"gcs.bucket": bucket_name}):
+        signed_url = blob.generate_signed_url(
+            expiration=expiration_time,
+            method="GET"
+        )
     
     return signed_url
@@ -0,0 +1,133 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from io import BytesIO
+
+from PIL import Image, ImageFilter, ImageOps
+
+from packages.common.config import (
+    AI_INPUT_DOWNSCALE_ENABLED,
+    AI_INPUT_MAX_EDGE,
+    AI_INPUT_CACHE_MB,
+    PREVIEW_MAX_EDGE,
+    PREVIEW_QUALITY,
+)
+
+ORIENTATION = 0x0112  # EXIF orientation tag
+
+# Longest edge each model family actually uses; anything larger is resampled away
+# server-side, so sending it only costs upload time. Matched by model id prefix.
+DEFAULT_MAX_EDGE = {
+    "gemini": 1536,
+    "imagen": 1024,
+}
+
+_lock = threading.Lock()
+_prepared = OrderedDict()  # (sha256, model_id, format) -> bytes
+_prepared_bytes = 0
+
+
+def _parse(raw: str) -> dict:
+    """"imagen=1536,gemini-2.5=2048" -> {"imagen": 1536, "gemini-2.5": 2048}"""
+    out = {}
+    for item in raw.split(","):
+        if "=" in item:
+            prefix, edge = item.split("=", 1)
+            out[prefix.strip()] = int(edge)
+    return out
+
+
+MAX_EDGE = {**DEFAULT_MAX_EDGE, **_parse(AI_INPUT_MAX_EDGE)}
+
+
+def max_edge(model_id: str) -> int | None:
+    """Effective input resolution for model_id (longest matching prefix wins)"""
+    matches = [p for p in MAX_EDGE if model_id.startswith(p)]
+    return MAX_EDGE[max(matches, key=len)] if matches else None
+
+
+def fit_for_model(data: bytes, model_id: str, fmt: str = "JPEG") -> bytes:
+    """Downscale and re-encode an input image to the model's effective resolution.
+
+    Images already within bounds are passed through untouched. Results are cached
+    per (content checksum, model, format) so repeated assets are only resized once.
+    """
+    edge = max_edge(model_id)
+    if not AI_INPUT_DOWNSCALE_ENABLED or edge is None:
+        return data
+    key = (hashlib.sha256(data).hexdigest(), model_id, fmt)
+    with _lock:
+        cached = _prepared.get(key)
+        if cached is not None:
+            _prepared.move_to_end(key)
+            return cached
+
+    img = Image.open(BytesIO(data))
+    rotated = img.getexif().get(ORIENTATION, 1) != 1
+    if max(img.size) <= edge and not rotated:
+        out = data
+    else:
+        # Re-encoding drops EXIF, so bake the orientation into the pixels first
+        img = ImageOps.exif_transpose(img)
+        img = img.convert("L" if img.mode in ("1", "L") else "RGB")
+        img.thumbnail((edge, edge), Image.Resampling.LANCZOS)
+        buffer = BytesIO()
+        if fmt == "JPEG":
+            img.save(buffer, format="JPEG", quality=90)
+        else:
+            img.save(buffer, format=fmt)
+        out = buffer.getvalue()
+    _remember(key, out)
+    return out
+
+
+def _remember(key: tuple, value: bytes) -> None:
+    global _prepared_bytes
+    budget = AI_INPUT_CACHE_MB * 1024 * 1024
+    with _lock:
+        if key in _prepared:
+            return
+        _prepared[key] = value
+        _prepared_bytes += len(value)
+        while _prepared_bytes > budget and _prepared:
+            _, evicted = _prepared.popitem(last=False)
+            _prepared_bytes -= len(evicted)
+
+
+def restore(original: bytes, result: bytes, mask: bytes | None = None, quality: int = 95) -> bytes:
+    """Bring a model result made from a downscaled input back to the original resolution.
+
+    With a mask (white = edited) only the edited region is taken from the upscaled
+    result; everything else keeps the original full-resolution pixels.
+    """
+    # Upright like the fit_for_model input the result was made from
+    base = ImageOps.exif_transpose(Image.open(BytesIO(original))).convert("RGB")
+    edited = Image.open(BytesIO(result)).convert("RGB")
+    if edited.size == base.size and mask is None:
+        return result
+    if edited.size != base.size:
+        edited = edited.resize(base.size, Image.Resampling.LANCZOS)
+    if mask is not None:
+        alpha = Image.open(BytesIO(mask)).convert("L").resize(base.size, Image.Resampling.LANCZOS)
+        # Feather the seam so the upscaled region blends into the sharper original
+        alpha = alpha.filter(ImageFilter.GaussianBlur(radius=max(1, max(base.size) // 512)))
+        edited = Image.composite(edited, base, alpha)
+    out = BytesIO()
+    edited.save(out, format="JPEG", quality=quality)
+    return out.getvalue()
+
+
+def preview(data: bytes, edge: int = PREVIEW_MAX_EDGE, quality: int = PREVIEW_QUALITY) -> bytes:
+    """Small WebP of an output image, cheap enough to show before the full-resolution result"""
+    img = Image.open(BytesIO(data))
+    img.draft("RGB", (edge, edge))  # JPEG: let the decoder skip most of the full-size work
+    img = img.convert("RGB")
+    img.thumbnail((edge, edge), Image.Resampling.BILINEAR)
+    out = BytesIO()
+    img.save(out, format="WEBP", quality=quality, method=2)
+    return out.getvalue()
+
+
+def stats() -> dict:
+    with _lock:
+        return {"entries": len(_prepared), "bytes": _prepared_bytes}
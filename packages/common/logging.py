@@ -1,13 +1,171 @@
+import atexit
+import contextvars
+import copy
+import json
 import logging
+import logging.handlers
 import os
+import queue
+import random
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# LOG_FORMAT=json (default) or text; LOG_ASYNC=0 writes from the calling thread instead
+# LOG_DEBUG_SAMPLE="/nlp/compose=0.1,default=0.01": fraction of requests per route whose
+# debug records are emitted even when LOG_LEVEL is INFO (longest route prefix wins)
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+LOG_ASYNC = os.getenv("LOG_ASYNC", "1") == "1"
+LOG_DEBUG_SAMPLE = os.getenv("LOG_DEBUG_SAMPLE", "")
+
+# Attributes every LogRecord has; anything else on a record came from extra={...}
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "taskName"}
+
+_context = contextvars.ContextVar("log_context", default={})
+_lock = threading.Lock()
+_handler = None
+_listener = None
+
+
+def _parse_rates(raw: str) -> dict:
+    rates = {}
+    for item in raw.split(","):
+        if "=" in item:
+            route, rate = item.rsplit("=", 1)
+            rates[route.strip()] = float(rate)
+    return rates
+
+
+DEBUG_SAMPLE = _parse_rates(LOG_DEBUG_SAMPLE)
+
+
+def _sample_rate(route: str | None) -> float:
+    if route:
+        matches = [p for p in DEBUG_SAMPLE if p != "default" and route.startswith(p)]
+        if matches:
+            return DEBUG_SAMPLE[max(matches, key=len)]
+    return DEBUG_SAMPLE.get("default", 0.0)
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, bound context and extra fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        out = {
+            "ts": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RESERVED:
+                out[key] = value
+        if record.exc_info:
+            out["exc_info"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            out["exc_info"] = record.exc_text
+        return json.dumps(out, default=str)
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """Hand records to the listener with only the message merged; formatting happens off-thread"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            # Tracebacks can't be pickled or safely formatted later, so render them now
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class ContextFilter(logging.Filter):
+    """Copy the bound context onto each record and drop unsampled records below LOG_LEVEL"""
+
+    def __init__(self, level: int):
+        super().__init__()
+        self.level = level
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        ctx = _context.get()
+        if record.levelno < self.level and not ctx.get("debug_sampled"):
+            return False
+        for key, value in ctx.items():
+            if key != "debug_sampled" and not hasattr(record, key):
+                setattr(record, key, value)
+        return True
+
+
+def _shared_handler(level: int) -> logging.Handler:
+    """Process-wide handler; with LOG_ASYNC records are formatted and written by a listener thread"""
+    global _handler, _listener
+    with _lock:
+        if _handler is None:
+            stream = logging.StreamHandler(sys.stdout)
+            if LOG_FORMAT == "text":
+                stream.setFormatter(logging.Formatter("[%(asctime)s] %(levelname)s %(name)s: %(message)s"))
+            else:
+                stream.setFormatter(JsonFormatter())
+            if LOG_ASYNC:
+                q = queue.SimpleQueue()
+                _handler = _QueueHandler(q)
+                _listener = logging.handlers.QueueListener(q, stream, respect_handler_level=False)
+                _listener.start()
+                atexit.register(_listener.stop)  # drain what's queued on shutdown
+            else:
+                _handler = stream
+            _handler.addFilter(ContextFilter(level))
+        return _handler
+
 
 def get_logger(name: str):
-    lvl = os.getenv("LOG_LEVEL", "INFO").upper()
+    lvl = logging.getLevelName(os.getenv("LOG_LEVEL", "INFO").upper())
     logger = logging.getLogger(name)
     if not logger.handlers:
-        handler = logging.StreamHandler()
-        fmt = logging.Formatter("[%(asctime)s] %(levelname)s %(name)s: %(message)s")
-        handler.setFormatter(fmt)
-        logger.addHandler(handler)
-    logger.setLevel(lvl)
+        logger.addHandler(_shared_handler(lvl))
+        logger.propagate = False
+    # Sampled debug records must reach the filter, which applies LOG_LEVEL itself
+    logger.setLevel(min(lvl, logging.DEBUG) if DEBUG_SAMPLE else lvl)
     return logger
+
+
+@contextmanager
+def log_context(**fields):
+    """Bind fields (route, job_id, ...) to every record logged inside the block.
+
+    Binding a route also decides, once for the whole block, whether its debug
+    records are sampled in.
+    """
+    ctx = {**_context.get(), **{k: v for k, v in fields.items() if v is not None}}
+    if "route" in fields:
+        ctx["debug_sampled"] = random.random() < _sample_rate(fields["route"])
+    token = _context.set(ctx)
+    try:
+        yield
+    finally:
+        _context.reset(token)
+
+
+@contextmanager
+def span(name: str, logger: logging.Logger | None = None, level: int = logging.INFO, **fields):
+    """Time a block and log it with `duration_ms`; the yielded dict adds fields to that record.
+
+    The duration is also recorded as a stage in the request's Server-Timing breakdown.
+    """
+    from packages.common import timing
+
+    attrs = dict(fields)
+    start = time.perf_counter()
+    try:
+        yield attrs
+    except BaseException as e:
+        attrs["error"] = type(e).__name__
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        timing.record(name, elapsed)
+        attrs.update(span=name, duration_ms=round(elapsed * 1000, 2))
+        (logger or get_logger("span")).log(level, name, extra=attrs)
@@ -0,0 +1,162 @@
+# Prometheus metrics for the API and worker. Hot-path updates are one labelled
+# counter/histogram bump; gauges mirroring existing in-process stats (caches, quota
+# limiter, executor queue) are only read at scrape time. Without prometheus_client
+# (or with METRICS_ENABLED=0) every helper is a no-op and /metrics returns 501.
+from packages.common.config import METRICS_ENABLED
+
+try:
+    import prometheus_client
+except ImportError:  # optional: metrics just switch off
+    prometheus_client = None
+
+ENABLED = METRICS_ENABLED and prometheus_client is not None
+
+# Model calls and whole jobs take seconds to minutes, not milliseconds
+SLOW_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+
+if ENABLED:
+    from prometheus_client import Counter, Gauge, Histogram
+    from prometheus_client.core import GaugeMetricFamily
+
+    REQUEST_LATENCY = Histogram(
+        "http_request_duration_seconds", "HTTP request latency", ["service", "route", "method", "status"],
+    )
+    IN_FLIGHT = Gauge("http_requests_in_flight", "Requests currently being served", ["service"])
+    JOB_DURATION = Histogram(
+        "job_duration_seconds", "Worker job duration by type", ["type", "status"], buckets=SLOW_BUCKETS,
+    )
+    STAGE_DURATION = Histogram(
+        "stage_duration_seconds", "Duration of timed stages (download, model, crop, upload, ...)", ["stage"],
+        buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1) + SLOW_BUCKETS[4:],
+    )
+    AI_CALL_LATENCY = Histogram(
+        "ai_call_duration_seconds", "Model call latency per attempt", ["model", "outcome"], buckets=SLOW_BUCKETS,
+    )
+    QUEUE_WAIT = Histogram(
+        "job_queue_wait_seconds", "Time from Pub/Sub publish to the worker picking the job up", ["type"],
+        buckets=SLOW_BUCKETS,
+    )
+    JOB_CPU = Histogram("job_cpu_seconds", "Process CPU time while a job ran", ["type"], buckets=SLOW_BUCKETS)
+    JOB_PEAK_RSS = Histogram(
+        "job_peak_rss_delta_bytes", "Peak resident memory growth while a job ran", ["type"],
+        buckets=tuple(mb * 2**20 for mb in (8, 16, 32, 64, 128, 256, 512, 1024, 2048)),
+    )
+    JOB_TRACED_PEAK = Histogram(
+        "job_tracemalloc_peak_bytes", "Peak Python heap allocated while a job ran", ["type"],
+        buckets=tuple(mb * 2**20 for mb in (1, 4, 16, 64, 256, 1024)),
+    )
+    GCS_BYTES = Counter("gcs_bytes_total", "Bytes moved to/from Cloud Storage", ["direction"])
+
+
+def observe_request(service: str, route: str, method: str, status: int, seconds: float) -> None:
+    if ENABLED:
+        REQUEST_LATENCY.labels(service, route, method, str(status)).observe(seconds)
+
+
+def in_flight(service: str):
+    """Context manager tracking in-flight requests (a no-op one when disabled)"""
+    if ENABLED:
+        return IN_FLIGHT.labels(service).track_inprogress()
+    from contextlib import nullcontext
+    return nullcontext()
+
+
+def observe_job(job_type: str, status: str, seconds: float) -> None:
+    if ENABLED:
+        JOB_DURATION.labels(job_type or "unknown", status or "unknown").observe(seconds)
+
+
+def observe_job_resources(job_type: str, stats: dict) -> None:
+    if not ENABLED:
+        return
+    job_type = job_type or "unknown"
+    JOB_CPU.labels(job_type).observe(stats["cpu_seconds"])
+    if "peak_rss_delta_bytes" in stats:
+        JOB_PEAK_RSS.labels(job_type).observe(stats["peak_rss_delta_bytes"])
+    if "tracemalloc_peak_bytes" in stats:
+        JOB_TRACED_PEAK.labels(job_type).observe(stats["tracemalloc_peak_bytes"])
+
+
+def observe_queue_wait(job_type: str, seconds: float) -> None:
+    if ENABLED:
+        QUEUE_WAIT.labels(job_type or "unknown").observe(max(seconds, 0.0))
+
+
+def observe_stage(stage: str, seconds: float) -> None:
+    if ENABLED:
+        STAGE_DURATION.labels(stage).observe(seconds)
+
+
+def observe_ai_call(model_id: str, ok: bool, seconds: float) -> None:
+    if ENABLED:
+        AI_CALL_LATENCY.labels(model_id, "ok" if ok else "error").observe(seconds)
+
+
+def count_gcs_bytes(direction: str, n: int) -> None:
+    if ENABLED:
+        GCS_BYTES.labels(direction).inc(n)
+
+
+class StatsCollector:
+    """Scrape-time gauges read from the stats() the caches, limiter and executors already keep"""
+
+    def describe(self):
+        return []  # keeps registration from scraping (and importing the AI stack) early
+
+    def collect(self):
+        yield from self._caches()
+        yield from self._ai()
+
+    def _caches(self):
+        hits = GaugeMetricFamily("cache_hit_ratio", "Hit ratio since start-up", labels=["cache"])
+        entries = GaugeMetricFamily("cache_entries", "Entries currently cached", labels=["cache"])
+        from packages.common import fetch, imaging
+        from packages.common.cache import response_cache
+
+        cache = response_cache()
+        if cache is not None:
+            s = cache.stats()
+            hits.add_metric(["ai_response"], s["hit_rate"])
+            entries.add_metric(["ai_response"], s["memory_entries"])
+        s = fetch.stats()
+        lookups = s["hits"] + s["revalidated"] + s["fetched"]
+        hits.add_metric(["fetch"], (s["hits"] + s["revalidated"]) / lookups if lookups else 0.0)
+        entries.add_metric(["fetch"], s["entries"])
+        entries.add_metric(["model_input"], imaging.stats()["entries"])
+        yield hits
+        yield entries
+
+    def _ai(self):
+        from services.worker.ai import resilience
+        from services.worker.ai.limiter import limiter
+
+        queue = GaugeMetricFamily("ai_executor_queue_depth", "Model calls waiting for an executor thread")
+        queue.add_metric([], resilience.queue_depth())
+        yield queue
+
+        waiting = GaugeMetricFamily("ai_quota_waiting", "Calls queued for model quota", labels=["model"])
+        running = GaugeMetricFamily("ai_quota_in_flight", "Calls admitted and running", labels=["model"])
+        rejected = GaugeMetricFamily("ai_quota_rejected", "Calls rejected by the quota limiter", labels=["model"])
+        for model_id, s in limiter().stats().items():
+            waiting.add_metric([model_id], s["waiting"])
+            running.add_metric([model_id], s["in_flight"])
+            rejected.add_metric([model_id], s["rejected"])
+        yield waiting
+        yield running
+        yield rejected
+
+        circuit = GaugeMetricFamily("ai_circuit_open", "1 while the model's circuit breaker is not closed", labels=["model"])
+        for model_id, s in resilience.stats().items():
+            circuit.add_metric([model_id], 0 if s["state"] == "closed" else 1)
+        yield circuit
+
+
+if ENABLED:
+    prometheus_client.REGISTRY.register(StatsCollector())
+
+
+def render() -> tuple[bytes, str] | None:
+    """(body, content type) for a /metrics response, or None when metrics are off"""
+    if not ENABLED:
+        return None
+    return prometheus_client.generate_latest(), prometheus_client.CONTENT_TYPE_LATEST
@@ -0,0 +1,96 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+import traceback
+import tracemalloc
+from collections import Counter
+
+# On-demand profilers for live instances. Nothing here runs until an admin asks:
+# the CPU sampler is a thread that exists only for the requested window and
+# tracemalloc is started and stopped around each memory snapshot.
+_busy = threading.Lock()
+
+
+class ProfilerBusy(RuntimeError):
+    """Another profile is already running on this instance"""
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def sample_cpu(seconds: float, interval: float = 0.01) -> str:
+    """Sample every thread's stack for `seconds`; returns folded stacks (`a;b;c count`) for flamegraph tools"""
+    if not _busy.acquire(blocking=False):
+        raise ProfilerBusy("a profile is already running")
+    try:
+        me = threading.get_ident()
+        names = {}
+        counts = Counter()
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_name(frame))
+                    frame = frame.f_back
+                if ident not in names:
+                    names = {t.ident: t.name for t in threading.enumerate()}
+                counts[";".join([names.get(ident, str(ident))] + stack[::-1])] += 1
+            time.sleep(interval)
+        return "\n".join(f"{stack} {n}" for stack, n in counts.most_common()) + "\n"
+    finally:
+        _busy.release()
+
+
+async def memory_top(seconds: float, top: int = 25, group_by: str = "lineno") -> dict:
+    """Allocations made during the next `seconds` that are still alive, largest first"""
+    if not _busy.acquire(blocking=False):
+        raise ProfilerBusy("a profile is already running")
+    started_here = not tracemalloc.is_tracing()
+    try:
+        if started_here:
+            tracemalloc.start(25)
+        await asyncio.sleep(seconds)
+        snapshot = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ])
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        if started_here:
+            tracemalloc.stop()
+        _busy.release()
+    stats = snapshot.statistics(group_by)
+    return {
+        "traced_bytes": current,
+        "peak_bytes": peak,
+        "top": [
+            {"location": str(s.traceback[0]), "size_bytes": s.size, "count": s.count}
+            for s in stats[:top]
+        ],
+    }
+
+
+def stacks() -> dict:
+    """Current stack of every thread and every asyncio task on the running loop"""
+    names = {t.ident: t.name for t in threading.enumerate()}
+    threads = {
+        f"{names.get(ident, ident)} ({ident})": traceback.format_stack(frame)
+        for ident, frame in sys._current_frames().items()
+    }
+    tasks = {}
+    try:
+        for task in asyncio.all_tasks():
+            frames = task.get_stack()
+            tasks[task.get_name()] = [
+                line for f in frames for line in traceback.format_stack(f, limit=1)
+            ] or [repr(task)]
+    except RuntimeError:
+        pass  # no running loop (called from a thread)
+    return {"threads": threads, "tasks": tasks}
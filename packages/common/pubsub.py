@@ -1,11 +1,32 @@
 import base64
 import json
+from datetime import datetime
 from fastapi import Request, HTTPException
 
 async def parse_push(request: Request) -> dict:
+    """Decoded message data; attributes (trace context), id and publish time go on request.state.pubsub"""
     payload = await request.json()
     try:
-        data = payload["message"]["data"]
-        return json.loads(base64.b64decode(data).decode("utf-8"))
+        message = payload["message"]
+        msg = json.loads(base64.b64decode(message["data"]).decode("utf-8"))
     except Exception as e:
         raise HTTPException(400, f"Bad Pub/Sub payload: {e}")
+    request.state.pubsub = {
+        "attributes": message.get("attributes") or {},
+        "message_id": message.get("messageId") or message.get("message_id"),
+        "publish_time": _epoch(message.get("publishTime") or message.get("publish_time")),
+    }
+    return msg
+
+def _epoch(rfc3339: str | None) -> float | None:
+    """Pub/Sub publishTime ("2026-10-19T14:30:18.123456789Z") as epoch seconds"""
+    if not rfc3339:
+        return None
+    try:
+        stamp = rfc3339.rstrip("Z")
+        if "." in stamp:
+            whole, frac = stamp.split(".", 1)
+            stamp = f"{whole}.{frac[:6]}"  # fromisoformat takes at most microseconds
+        return datetime.fromisoformat(stamp + "+00:00").timestamp()
+    except ValueError:
+        return None
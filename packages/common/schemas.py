@@ -6,3 +6,39 @@ class CompositeJob(BaseModel):
     agent_gcs: str
     room_gcs: str
     brief: str = Field(default="")
+
+# Structured model output for smart edits: one schema-constrained response
+# carries both the edit analysis and the marketing copy.
+class EditAnalysis(BaseModel):
+    primary_operation: str
+    target_elements: list[str]
+    parameters: dict[str, str | None] = Field(default_factory=dict)
+    confidence: float = Field(ge=0.0, le=1.0)
+    fallback_operation: str = "modify"
+    reasoning: str = ""
+
+class MarketingCopy(BaseModel):
+    caption: str = Field(min_length=1)
+    facts: list[str] = Field(min_length=1)
+    cta: str = Field(min_length=1)
+
+class SmartEditPlan(BaseModel):
+    analysis: EditAnalysis
+    content: MarketingCopy
+
+class CaptionBrief(BaseModel):
+    id: str
+    brief: str
+    staged: bool = False
+
+class CaptionBatchRequest(BaseModel):
+    briefs: list[CaptionBrief] = Field(min_length=1)
+    platforms: list[str] = Field(default_factory=lambda: ["instagram", "x", "tiktok"])
+
+class BatchCaption(BaseModel):
+    id: str
+    platform: str
+    caption: str
+
+class BatchCaptionResult(BaseModel):
+    captions: list[BatchCaption]
@@ -0,0 +1,172 @@
+import re
+from functools import lru_cache
+
+# Keyword taxonomy for prompt analysis. Within a category, labels are listed in
+# priority order (callers usually take the first match). Keywords match as plain
+# lowercase substrings, same as the `"word" in prompt.lower()` checks they replace.
+TAXONOMY = {
+    "room": {
+        "living room": ["living", "lounge", "family room"],
+        "kitchen": ["kitchen", "cooking", "culinary"],
+        "bedroom": ["bedroom", "master bedroom", "guest room"],
+        "bathroom": ["bathroom", "bath", "powder room"],
+        "dining room": ["dining", "eat-in"],
+        "office": ["office", "study", "workspace"],
+        "outdoor": ["patio", "deck", "garden", "outdoor", "backyard"],
+    },
+    "style": {
+        "scandinavian": ["scandinavian", "nordic", "hygge"],
+        "modern": ["modern", "contemporary", "sleek"],
+        "traditional": ["traditional", "classic", "timeless"],
+        "minimalist": ["minimalist", "clean", "simple"],
+        "luxury": ["luxury", "upscale", "premium", "high-end"],
+        "rustic": ["rustic", "farmhouse", "country"],
+        "industrial": ["industrial", "loft", "urban"],
+    },
+    "feature": {
+        "natural_light": ["natural light", "bright", "sunny"],
+        "spacious": ["spacious", "large", "open"],
+        "updated": ["updated", "renovated", "new"],
+        "premium_materials": ["hardwood", "marble", "granite"],
+    },
+    "staging": {
+        "staged": ["staging", "furnished", "virtual"],
+    },
+    "specialization": {
+        "luxury_properties": ["luxury", "upscale", "premium", "high-end", "executive"],
+        "first_time_buyers": ["first-time", "starter", "affordable", "condo"],
+        "investment_properties": ["investment", "rental", "income"],
+        "commercial_real_estate": ["commercial", "office", "retail"],
+        "waterfront_properties": ["waterfront", "lake", "ocean", "beach"],
+    },
+    "cta": {
+        "open_house": ["open house"],
+        "showing": ["showing"],
+        "tour": ["tour"],
+    },
+    # Rooms/styles named explicitly in the prompt (facts and virtual staging)
+    "named_room": {
+        "living room": ["living room"],
+        "kitchen": ["kitchen"],
+        "bedroom": ["bedroom"],
+        "bathroom": ["bathroom"],
+        "dining room": ["dining"],
+        "office": ["office"],
+    },
+    "named_style": {
+        "scandinavian": ["scandinavian"],
+        "contemporary": ["contemporary"],
+        "traditional": ["traditional"],
+        "minimalist": ["minimalist"],
+    },
+    "edit": {
+        "remove": ["remove"],
+        "edit": ["edit"],
+        "enhance": ["enhance"],
+        "improve": ["improve"],
+        "lighting": ["lighting"],
+        "color": ["color"],
+    },
+    # Smart-edit instruction analysis (keyword fallback when the model isn't used)
+    "operation": {
+        "remove": ["remove", "delete", "erase"],
+        "replace": ["replace", "change", "swap"],
+        "lighting_adjust": ["brighten", "darken", "lighting"],
+        "color_change": ["color", "paint", "recolor"],
+    },
+    "target": {
+        "furniture": ["furniture"],
+        "wall": ["wall"],
+        "couch": ["couch", "sofa"],
+        "lighting": ["lighting", "light"],
+        "counter": ["counter"],
+    },
+}
+
+
+class Classification:
+    """Every taxonomy label found in one prompt, per category in priority order"""
+
+    __slots__ = ("_labels",)
+
+    def __init__(self, labels: dict):
+        self._labels = labels
+
+    def labels(self, category: str) -> tuple:
+        return self._labels.get(category, ())
+
+    def first(self, category: str, default=None):
+        found = self._labels.get(category)
+        return found[0] if found else default
+
+    def has(self, category: str, label: str | None = None) -> bool:
+        found = self._labels.get(category, ())
+        return bool(found) if label is None else label in found
+
+
+class Matcher:
+    """All keywords of a taxonomy compiled into one regex, scanned once per text.
+
+    The pattern is a zero-width lookahead so matches may overlap ("room" inside
+    "living room"); keywords that are prefixes of a longer match found at the same
+    position are added from a precomputed closure. The alternation is built as a
+    character trie so the regex engine doesn't retry every keyword at every offset.
+    """
+
+    def __init__(self, taxonomy: dict):
+        self._owners = {}  # keyword -> [(category, label), ...]
+        self._order = {}  # category -> [label, ...] in priority order
+        for category, labels in taxonomy.items():
+            self._order[category] = list(labels)
+            for label, keywords in labels.items():
+                for keyword in keywords:
+                    self._owners.setdefault(keyword.lower(), []).append((category, label))
+        keywords = sorted(self._owners, key=len, reverse=True)
+        self._pattern = re.compile("(?=(" + _trie_regex(keywords) + "))")
+        self._closure = {
+            k: frozenset(p for p in keywords if k.startswith(p)) for k in keywords
+        }
+
+    def keywords(self, text: str) -> set:
+        found = set()
+        for m in self._pattern.finditer(text.lower()):
+            found |= self._closure[m.group(1)]
+        return found
+
+    def classify(self, text: str) -> Classification:
+        hits = {}
+        for keyword in self.keywords(text):
+            for category, label in self._owners[keyword]:
+                hits.setdefault(category, set()).add(label)
+        return Classification({
+            category: tuple(label for label in self._order[category] if label in found)
+            for category, found in hits.items()
+        })
+
+
+def _trie_regex(keywords) -> str:
+    """Regex matching any of the keywords, longest first, factored by common prefix"""
+    trie = {}
+    for keyword in keywords:
+        node = trie
+        for ch in keyword:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def build(node) -> str:
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        return f"(?:{body})?" if "" in node else body
+
+    return build(trie)
+
+
+_matcher = Matcher(TAXONOMY)
+
+
+@lru_cache(maxsize=512)
+def classify(text: str) -> Classification:
+    """Classify a prompt; repeated calls for the same prompt (one per helper) hit the cache"""
+    return _matcher.classify(text)
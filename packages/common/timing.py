@@ -0,0 +1,86 @@
+import contextvars
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+from packages.common import metrics, tracing
+
+# Stage -> [count, total seconds] for the current request or job. The dict is shared
+# (not copied) into threads started with asyncio.to_thread, so stages timed there
+# land in the same breakdown.
+_current = contextvars.ContextVar("timings", default=None)
+
+_lock = threading.Lock()
+_totals = {}  # stage -> [count, total seconds, max seconds], for the life of the process
+
+
+@contextmanager
+def collect():
+    """Start a fresh per-request/per-job breakdown; yields the dict stages are added to"""
+    timings = {}
+    token = _current.set(timings)
+    try:
+        yield timings
+    finally:
+        _current.reset(token)
+
+
+def record(name: str, seconds: float) -> None:
+    """Add one timed stage to the current breakdown (if any) and the process-wide totals"""
+    timings = _current.get()
+    if timings is not None:
+        entry = timings.setdefault(name, [0, 0.0])
+        entry[0] += 1
+        entry[1] += seconds
+    metrics.observe_stage(name, seconds)
+    with _lock:
+        total = _totals.setdefault(name, [0, 0.0, 0.0])
+        total[0] += 1
+        total[1] += seconds
+        total[2] = max(total[2], seconds)
+
+
+@contextmanager
+def stage(name: str):
+    """Time (and trace) a block as stage `name`; repeated stages (one upload per crop) are summed"""
+    start = time.perf_counter()
+    try:
+        with tracing.span(name):
+            yield
+    finally:
+        record(name, time.perf_counter() - start)
+
+
+def breakdown(timings: dict | None = None) -> dict:
+    """{stage: milliseconds} for a collected breakdown (default: the current one)"""
+    timings = _current.get() if timings is None else timings
+    return {name: round(total * 1000, 1) for name, (_, total) in (timings or {}).items()}
+
+
+def server_timing(timings: dict) -> str:
+    """Server-Timing header value, e.g. `download;dur=41.2, model;dur=8110.5, request;dur=8302.0`"""
+    return ", ".join(f"{_token(name)};dur={ms}" for name, ms in breakdown(timings).items())
+
+
+def _token(name: str) -> str:
+    return re.sub(r"[^A-Za-z0-9!#$%&'*+.^_`|~-]", "_", name)
+
+
+def summary() -> dict:
+    """Process-wide latency per stage since start-up"""
+    with _lock:
+        return {
+            name: {
+                "count": count,
+                "total_ms": round(total * 1000, 1),
+                "mean_ms": round(total * 1000 / count, 1),
+                "max_ms": round(peak * 1000, 1),
+            }
+            for name, (count, total, peak) in sorted(_totals.items())
+        }
+
+
+def reset() -> None:
+    with _lock:
+        _totals.clear()
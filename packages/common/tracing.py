@@ -0,0 +1,89 @@
+from contextlib import contextmanager
+
+from packages.common.config import TRACING_EXPORTER, TRACING_SAMPLE_RATIO, TRACING_SERVICE_NAME
+
+# OpenTelemetry tracing. TRACING_EXPORTER is "" (off: every helper is a no-op), "console",
+# "memory" (kept in-process for offline tests and benchmarks, see finished_spans())
+# or "otlp" (OTLP/HTTP to OTEL_EXPORTER_OTLP_ENDPOINT). Trace context crosses Pub/Sub
+# as W3C `traceparent` message attributes.
+_tracer = None
+_memory = None
+
+
+def tracer():
+    global _tracer, _memory
+    if _tracer is None and TRACING_EXPORTER:
+        from opentelemetry import trace
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter, SimpleSpanProcessor
+        from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+
+        provider = TracerProvider(
+            resource=Resource.create({"service.name": TRACING_SERVICE_NAME}),
+            sampler=ParentBased(TraceIdRatioBased(TRACING_SAMPLE_RATIO)),
+        )
+        if TRACING_EXPORTER == "memory":
+            from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+            _memory = InMemorySpanExporter()
+            provider.add_span_processor(SimpleSpanProcessor(_memory))
+        elif TRACING_EXPORTER == "otlp":
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+
+            provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+        else:
+            provider.add_span_processor(BatchSpanProcessor(ConsoleSpanExporter()))
+        trace.set_tracer_provider(provider)
+        _tracer = trace.get_tracer("recontent")
+    return _tracer
+
+
+@contextmanager
+def span(name: str, kind: str = "internal", context=None, **attributes):
+    """Run a block as a span (child of the current one, or of `context` from extract())"""
+    t = tracer()
+    if t is None:
+        yield
+        return
+    from opentelemetry.trace import SpanKind
+
+    attrs = {k: v for k, v in attributes.items() if v is not None}
+    with t.start_as_current_span(name, context=context, kind=SpanKind[kind.upper()], attributes=attrs):
+        yield
+
+
+def annotate(**attributes) -> None:
+    """Set attributes on the current span"""
+    if tracer() is None:
+        return
+    from opentelemetry import trace
+
+    current = trace.get_current_span()
+    for key, value in attributes.items():
+        if value is not None:
+            current.set_attribute(key, value)
+
+
+def inject() -> dict:
+    """Carrier with the current trace context, e.g. for Pub/Sub message attributes"""
+    carrier = {}
+    if tracer() is not None:
+        from opentelemetry import propagate
+
+        propagate.inject(carrier)
+    return carrier
+
+
+def extract(carrier) -> object | None:
+    """Parent context from a carrier written by inject() (or incoming HTTP headers)"""
+    if tracer() is None or not carrier:
+        return None
+    from opentelemetry import propagate
+
+    return propagate.extract(carrier)
+
+
+def finished_spans() -> list:
+    """Spans recorded so far with TRACING_EXPORTER=memory"""
+    return list(_memory.get_finished_spans()) if _memory is not None else []
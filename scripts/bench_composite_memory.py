@@ -0,0 +1,115 @@
+"""Peak memory of one compositor.run job, asserted against a budget.
+
+The model is replaced by a client returning --variants JPEGs of --size, GCS
+downloads come from generated fixtures and uploads are discarded, so this runs
+offline. Peak is resident memory (Pillow's pixel buffers aren't visible to
+tracemalloc) sampled from /proc while the job runs, minus the resident size just
+before it starts.
+
+Usage:
+    python scripts/bench_composite_memory.py [--size 4096x3072] [--variants 3] [--budget-mb 96]
+"""
+import argparse
+import gc
+import os
+import sys
+import threading
+import time
+from io import BytesIO
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+PAGE = os.sysconf("SC_PAGE_SIZE")
+
+
+def rss() -> int:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * PAGE
+
+
+class PeakSampler:
+    """Highest RSS seen while the block runs, relative to the RSS on entry"""
+
+    def __enter__(self):
+        gc.collect()
+        self.base = self.peak = rss()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, rss())
+            time.sleep(0.002)
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, rss())
+
+    @property
+    def delta_mb(self) -> float:
+        return (self.peak - self.base) / 2**20
+
+
+def jpeg(size: tuple, seed: int) -> bytes:
+    """Noisy JPEG so encoded sizes are realistic rather than a few KB of flat colour"""
+    from PIL import Image
+
+    img = Image.effect_noise(size, 40 + seed).convert("RGB")
+    out = BytesIO()
+    img.save(out, format="JPEG", quality=90)
+    return out.getvalue()
+
+
+class FixedClient:
+    def __init__(self, variants: list[bytes]):
+        self.variants = variants
+
+    def composite(self, agent_bytes, room_bytes, brief):
+        return list(self.variants)  # fresh list per call, like a real response
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", default="4096x3072")
+    parser.add_argument("--variants", type=int, default=3)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--budget-mb", type=float, default=96.0, help="fail if the peak exceeds this")
+    args = parser.parse_args()
+
+    os.environ.setdefault("AI_INPUT_BY_URI", "0")
+    from services.worker.processors import compositor
+
+    size = tuple(int(x) for x in args.size.lower().split("x"))
+    inputs = {"gs://bench/agent.jpg": jpeg(size, 0), "gs://bench/room.jpg": jpeg(size, 1)}
+    client = FixedClient([jpeg(size, i + 2) for i in range(args.variants)])
+    compositor.download_bytes = inputs.__getitem__
+    compositor.upload_bytes = lambda uri, data, content_type="image/jpeg": uri
+    compositor.get_client = lambda: client
+    job = {"agent_gcs": "gs://bench/agent.jpg", "room_gcs": "gs://bench/room.jpg", "brief": "", "org_id": 1}
+    encoded_mb = sum(map(len, client.variants)) / 2**20
+    decoded_mb = size[0] * size[1] * 3 / 2**20
+    print(f"{args.variants} variants of {args.size}: {encoded_mb:.1f} MiB encoded, {decoded_mb:.1f} MiB per decoded variant\n")
+
+    compositor.run(job)  # warm up imports and Pillow's codec state before measuring
+    samples = []
+    for _ in range(args.runs):
+        with PeakSampler() as sampler:
+            outputs = compositor.run(job)
+        assert len(outputs) == args.variants * 3, outputs
+        samples.append(sampler.delta_mb)
+    peak = max(samples)
+    print(f"compositor.run peak +{peak:.1f} MiB  (runs: {', '.join(f'{s:.1f}' for s in samples)})")
+
+    if peak > args.budget_mb:
+        print(f"\nFAIL: peak {peak:.1f} MiB exceeds budget {args.budget_mb} MiB")
+        return 1
+    print(f"\nOK: within {args.budget_mb} MiB budget")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
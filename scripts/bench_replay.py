@@ -0,0 +1,113 @@
+"""End-to-end benchmark of compositor.run and POST /nlp/compose against a cassette.
+
+Record once against real Vertex (needs credentials), then replay anywhere:
+
+    AI_CASSETTE_MODE=record MOCK_AI=0 python scripts/bench_replay.py --runs 1
+    AI_CASSETTE_MODE=replay MOCK_AI=0 AI_CASSETTE_REALTIME=0 python scripts/bench_replay.py --runs 20
+
+GCS is replaced by the local input images (--agent/--room, or generated fixtures)
+and uploads are discarded, so replay needs no network. With AI_CASSETTE_REALTIME=0
+the numbers are our own overhead only (decode, crops, encode, routing); with 1 they
+include the recorded model latency. --max-median fails the run for CI.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from io import BytesIO
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+PROMPTS = [
+    ("text_to_image", "Bright two-bedroom condo with a renovated kitchen and lake views"),
+    ("text_to_image", "Family home with a large backyard, finished basement and double garage"),
+]
+
+
+def fixture(color: tuple, size=(1600, 1200)) -> bytes:
+    """Deterministic JPEG so recorded request hashes match on every machine"""
+    from PIL import Image, ImageDraw
+
+    img = Image.new("RGB", size, color)
+    draw = ImageDraw.Draw(img)
+    for i in range(0, size[0], 80):
+        draw.line([(i, 0), (size[0] - i, size[1])], fill=(255 - color[0], 200, 120), width=6)
+    out = BytesIO()
+    img.save(out, format="JPEG", quality=90)
+    return out.getvalue()
+
+
+def read(path: str | None, color: tuple) -> bytes:
+    if path:
+        with open(path, "rb") as f:
+            return f.read()
+    return fixture(color)
+
+
+def timed(fn, runs: int) -> list[float]:
+    samples = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    return samples
+
+
+def report(name: str, samples: list[float]) -> float:
+    median = statistics.median(samples)
+    p95 = sorted(samples)[min(len(samples) - 1, int(0.95 * len(samples)))]
+    print(f"{name:<16} runs={len(samples):<3} median={median * 1000:8.1f} ms  p95={p95 * 1000:8.1f} ms")
+    return median
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--agent", help="agent photo (default: generated fixture)")
+    parser.add_argument("--room", help="room photo (default: generated fixture)")
+    parser.add_argument("--max-median", type=float, help="fail if any scenario's median exceeds this many seconds")
+    args = parser.parse_args()
+
+    # Each cassette entry is keyed by the exact request, so coalescing must not merge them
+    os.environ.setdefault("AI_COALESCE_ENABLED", "0")
+    os.environ.setdefault("AI_CACHE_ENABLED", "0")
+    os.environ.setdefault("AI_USAGE_ENABLED", "0")
+    os.environ.setdefault("AI_INPUT_BY_URI", "0")  # inputs come from local files, not GCS
+
+    from fastapi.testclient import TestClient
+    from packages.common.config import AI_CASSETTE_MODE, AI_CASSETTE_DIR
+    from services.api.main import app
+    from services.worker.processors import composer, compositor
+
+    inputs = {"gs://bench/agent.jpg": read(args.agent, (40, 60, 90)), "gs://bench/room.jpg": read(args.room, (180, 170, 150))}
+    uploaded = []
+    compositor.download_bytes = inputs.__getitem__
+    compositor.upload_bytes = lambda uri, data, content_type="image/jpeg": uploaded.append(len(data)) or uri
+    composer.download_bytes = inputs.__getitem__
+    composer.upload_bytes = compositor.upload_bytes
+    composer.get_signed_url = lambda uri, expiration_minutes=60: f"https://storage.invalid/{uri[5:]}"
+
+    print(f"cassette={AI_CASSETTE_DIR} mode={AI_CASSETTE_MODE or 'off'}\n")
+    job = {"agent_gcs": "gs://bench/agent.jpg", "room_gcs": "gs://bench/room.jpg", "brief": "Bright living room", "org_id": 1}
+    medians = [report("compositor.run", timed(lambda: compositor.run(job), args.runs))]
+    print(f"{'':<16} {len(uploaded) // args.runs} crops, {sum(uploaded) // args.runs // 1024} KiB uploaded per run")
+
+    client = TestClient(app)
+
+    def compose():
+        for composition_type, prompt in PROMPTS:
+            resp = client.post("/nlp/compose", json={"prompt": prompt, "composition_type": composition_type, "org_id": 1})
+            assert resp.status_code == 200, resp.text
+
+    medians.append(report("/nlp/compose", timed(compose, args.runs)))
+
+    if args.max_median is not None and max(medians) > args.max_median:
+        print(f"\nFAIL: median above {args.max_median}s")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,162 @@
+"""Cold-start benchmark for the API and worker apps.
+
+Every measurement runs in a fresh interpreter so nothing is already imported:
+
+- import time per module (from `python -X importtime`), for both app modules
+  and the heavy SDKs they used to pull in eagerly
+- time to first response: interpreter start -> app import -> first GET /health,
+  served in-process (ASGI) or, with --server, by a real uvicorn process
+
+Usage:
+    MOCK_AI=1 python scripts/bench_startup.py [--runs 3] [--server]
+"""
+import argparse
+import os
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+APPS = {
+    "api": "services.api.main",
+    "worker": "services.worker.main",
+}
+
+MODULES = [
+    "services.api.main",
+    "services.worker.main",
+    "fastapi",
+    "PIL.Image",
+    "vertexai",
+    "google.cloud.storage",
+    "google.cloud.pubsub_v1",
+    "google.cloud.sql.connector",
+    "stripe",
+    "sqlalchemy.orm",
+]
+
+# Heavy imports that should stay deferred; reported if an app module pulls them in.
+DEFERRED = ["vertexai", "google.cloud.storage", "google.cloud.pubsub_v1", "google.cloud.sql.connector", "stripe", "sqlalchemy"]
+
+_IMPORTTIME = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s+)(\S+)")
+
+_FIRST_RESPONSE = """
+import time
+t0 = time.perf_counter()
+import importlib
+app = importlib.import_module({module!r}).app
+t_import = time.perf_counter()
+from fastapi.testclient import TestClient
+resp = TestClient(app).get("/health")
+t_first = time.perf_counter()
+assert resp.status_code == 200, resp.status_code
+print(f"{{t_import - t0}} {{t_first - t0}}")
+"""
+
+
+def _env():
+    env = dict(os.environ)
+    env.setdefault("MOCK_AI", "1")
+    env["PYTHONPATH"] = ROOT + os.pathsep + env.get("PYTHONPATH", "")
+    return env
+
+
+def import_times(module: str) -> tuple[float, dict]:
+    """Cumulative import time of `module` (seconds) and the top-level packages it loaded"""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, env=_env(), capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+    total = 0.0
+    loaded = {}
+    for line in proc.stderr.splitlines():
+        m = _IMPORTTIME.match(line)
+        if not m:
+            continue
+        cumulative, name = int(m.group(2)) / 1e6, m.group(4)
+        loaded[name] = cumulative
+        if name == module:
+            total = cumulative
+    return total, loaded
+
+
+def first_response_inprocess(module: str) -> tuple[float, float]:
+    t0 = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-c", _FIRST_RESPONSE.format(module=module)],
+        cwd=ROOT, env=_env(), capture_output=True, text=True,
+    )
+    wall = time.perf_counter() - t0
+    if proc.returncode != 0:
+        raise RuntimeError(f"{module} failed to serve /health:\n{proc.stderr[-2000:]}")
+    t_import, _ = (float(x) for x in proc.stdout.split())
+    return t_import, wall
+
+
+def first_response_server(module: str, timeout: float = 60.0) -> tuple[float, float]:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    t0 = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", f"{module}:app", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, env=_env(), stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+    )
+    try:
+        while time.perf_counter() - t0 < timeout:
+            if proc.poll() is not None:
+                raise RuntimeError(f"uvicorn exited early:\n{proc.stderr.read().decode()[-2000:]}")
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1) as resp:
+                    if resp.status == 200:
+                        return float("nan"), time.perf_counter() - t0
+            except OSError:
+                time.sleep(0.02)
+        raise RuntimeError(f"{module} did not answer /health within {timeout}s")
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3, help="fresh interpreters per measurement (median reported)")
+    parser.add_argument("--server", action="store_true", help="measure first response through a real uvicorn process")
+    args = parser.parse_args()
+
+    print(f"MOCK_AI={_env()['MOCK_AI']}  python={sys.version.split()[0]}  runs={args.runs}\n")
+    print(f"{'module':<32} {'import ms':>10}")
+    for module in MODULES:
+        try:
+            samples = [import_times(module)[0] for _ in range(args.runs)]
+            print(f"{module:<32} {statistics.median(samples) * 1000:>10.1f}")
+        except RuntimeError as e:
+            print(f"{module:<32} {'n/a':>10}  ({str(e).splitlines()[0]})")
+
+    print()
+    for name, module in APPS.items():
+        _, loaded = import_times(module)
+        eager = [m for m in DEFERRED if m in loaded]
+        if eager:
+            print(f"warning: {module} imports {', '.join(eager)} at startup")
+
+    measure = first_response_server if args.server else first_response_inprocess
+    mode = "uvicorn" if args.server else "in-process ASGI"
+    print(f"\ntime to first /health response ({mode})")
+    print(f"{'app':<8} {'import ms':>10} {'first response ms':>18}")
+    for name, module in APPS.items():
+        samples = [measure(module) for _ in range(args.runs)]
+        t_import = statistics.median(s[0] for s in samples)
+        t_first = statistics.median(s[1] for s in samples)
+        print(f"{name:<8} {t_import * 1000:>10.1f} {t_first * 1000:>18.1f}")
+
+
+if __name__ == "__main__":
+    main()
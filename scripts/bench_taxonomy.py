@@ -0,0 +1,69 @@
+"""Micro-benchmark for prompt keyword analysis (packages/common/taxonomy.py).
+
+Compares the compiled single-pass matcher against the naive approach it replaced
+(lowercase the prompt and test every keyword with `in`), checks both agree, and
+times the per-request helper bundle /nlp/compose runs on every prompt.
+
+Usage:
+    python scripts/bench_taxonomy.py [--number 20000]
+"""
+import argparse
+import os
+import random
+import sys
+import timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from packages.common.taxonomy import TAXONOMY, Matcher, classify  # noqa: E402
+
+PROMPTS = [
+    "Bright modern kitchen with granite counters and a sunny eat-in nook, open house Sunday",
+    "Virtual staging of an empty living room in scandinavian style for a first-time buyer condo",
+    "Remove the old couch and brighten the lighting in the master bedroom",
+    "Luxury waterfront home with hardwood floors, renovated bathrooms and a large backyard deck",
+    "Cozy 2 bed apartment close to transit",
+]
+
+
+def naive(text: str) -> set:
+    lowered = text.lower()
+    return {k for labels in TAXONOMY.values() for keywords in labels.values() for k in keywords if k in lowered}
+
+
+def helpers(prompt: str) -> None:
+    from services.worker.processors import composer
+
+    composer.extract_property_context(prompt, "text_to_image")
+    composer.infer_agent_specialization(prompt)
+    composer.generate_facts_from_prompt(prompt)
+    composer.generate_cta_from_prompt(prompt)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--number", type=int, default=20000)
+    args = parser.parse_args()
+
+    matcher = Matcher(TAXONOMY)
+    random.seed(0)
+    vocabulary = [k for labels in TAXONOMY.values() for keywords in labels.values() for k in keywords] + ["the", "with", "a"]
+    fuzz = [" ".join(random.choices(vocabulary, k=random.randint(0, 12))) for _ in range(2000)]
+    mismatches = [p for p in PROMPTS + fuzz if matcher.keywords(p) != naive(p)]
+    print(f"agreement: {len(PROMPTS) + len(fuzz) - len(mismatches)}/{len(PROMPTS) + len(fuzz)} prompts")
+
+    n = args.number
+    for label, fn in (
+        ("naive keyword scan", lambda: [naive(p) for p in PROMPTS]),
+        ("compiled single pass", lambda: [matcher.classify(p) for p in PROMPTS]),
+        ("classify() cached", lambda: [classify(p) for p in PROMPTS]),
+        ("compose helper bundle", lambda: [helpers(p) for p in PROMPTS]),
+    ):
+        per_call = min(timeit.repeat(fn, number=n // len(PROMPTS), repeat=3)) / (n // len(PROMPTS)) / len(PROMPTS)
+        print(f"{label:<24} {per_call * 1e6:8.2f} us/prompt")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,61 @@
+"""Check that /nlp/compose/stream sends its first caption delta before the image is ready.
+
+Runs compose_events offline against the simulated backend with a slow image
+description call (--image-seconds) and a fast copy stream. Any blocking call
+left on the event loop by the image task shows up as the first caption arriving
+only once the image is done.
+
+Usage:
+    python scripts/check_stream_first_token.py [--image-seconds 3] [--max-first-seconds 1]
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+async def first_caption_and_image(prompt: str) -> tuple[float, float]:
+    from services.api.routers import nlp
+
+    started = time.perf_counter()
+    first = None
+    async for event in nlp.compose_events(nlp.ComposeRequest(prompt=prompt)):
+        kind = event.split("\n", 1)[0].removeprefix("event: ")
+        if kind == "caption" and first is None:
+            first = time.perf_counter() - started
+        if kind == "image":
+            return first, time.perf_counter() - started
+    raise RuntimeError("stream ended without an image event")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--image-seconds", type=float, default=3.0)
+    parser.add_argument("--max-first-seconds", type=float, default=1.0, help="fail if the first caption is later")
+    args = parser.parse_args()
+
+    profile = {
+        "generate": {"p50": args.image_seconds, "p95": args.image_seconds, "error_rate": 0, "throttle_rate": 0},
+        "stream_content": {"p50": 1.0, "p95": 1.0, "error_rate": 0, "throttle_rate": 0},
+    }
+    os.environ.update(
+        AI_BACKEND="sim", MOCK_AI="0", AI_SIM_TIME_SCALE="1", AI_CACHE_ENABLED="0",
+        AI_SIM_PROFILE_JSON=json.dumps(profile),
+    )
+    first, image = asyncio.run(first_caption_and_image("Bright two-bedroom condo with lake views"))
+    print(f"first caption {first:.2f}s, image {image:.2f}s")
+
+    if first is None or first > args.max_first_seconds or first >= image:
+        print(f"\nFAIL: first caption must arrive within {args.max_first_seconds}s and before the image")
+        return 1
+    print("\nOK: copy streams while the image is generated")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,101 @@
+"""Build the real Vertex requests for the structured (response_schema) calls, offline.
+
+The structured calls swallow errors and fall back to templates, so a request the
+SDK can't even construct only shows up as worse copy. This runs each call with
+the model replaced by one that builds the request with the SDK's own
+GenerativeModel._prepare_request and answers with schema-valid JSON, and fails
+if any request can't be built or any call falls back.
+
+Usage:
+    python scripts/check_vertex_requests.py
+"""
+import json
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+PLAN = {
+    "analysis": {
+        "primary_operation": "color_change",
+        "target_elements": ["walls"],
+        "parameters": {"color": "sage green"},
+        "confidence": 0.9,
+        "fallback_operation": "modify",
+        "reasoning": "check",
+    },
+    "content": {"caption": "check caption #Home", "facts": ["a", "b", "c"], "cta": "Book a showing"},
+}
+
+
+BRIEFS = [{"id": "1", "brief": "Sunny corner condo"}, {"id": "2", "brief": "Renovated bungalow", "staged": True}]
+CAPTION = "Bright, open and ready for you. Book a viewing this week #Home #ForSale #RealEstate"
+
+
+class Response:
+    def __init__(self, text: str):
+        self.text = text
+        self.candidates = []
+
+
+class RequestBuildingModel:
+    """Stands in for a GenerativeModel: builds the SDK request, then returns a canned answer"""
+
+    def __init__(self, model_id: str, answer, errors: list):
+        from vertexai.preview.generative_models import GenerativeModel
+
+        self.sdk = GenerativeModel(model_id)
+        self.answer = answer
+        self.errors = errors
+
+    def generate_content(self, contents, **kwargs):
+        try:
+            self.sdk._prepare_request(contents, **kwargs)
+        except Exception as e:
+            self.errors.append(f"{type(e).__name__}: {e}")
+            raise
+        return Response(json.dumps(self.answer(contents)))
+
+
+def main() -> int:
+    os.environ.setdefault("AI_CACHE_ENABLED", "0")
+    import vertexai
+    from services.worker.ai import vertex_client
+
+    vertexai.init(project="offline-check", location="us-central1")
+    client = vertex_client.VertexAIClient()
+    failures = []
+
+    def check(name: str, answer, call, fell_back) -> None:
+        errors = []
+        vertex_client.generative_model = lambda model_id: RequestBuildingModel(model_id, answer, errors)
+        result = call()
+        if errors or fell_back(result):
+            failures.append(f"{name}: {'; '.join(errors) or 'fell back to template output'}")
+        print(f"{name}: {'FAIL' if errors or fell_back(result) else 'ok'}")
+
+    check(
+        "plan_smart_edit",
+        lambda contents: PLAN,
+        lambda: client.plan_smart_edit("paint the walls sage green", "Living room", "smart_edit"),
+        lambda result: result["content"]["cta"] != PLAN["content"]["cta"],
+    )
+    check(
+        "caption_batch",
+        lambda contents: {"captions": [
+            {"id": b["id"], "platform": p, "caption": CAPTION} for b in BRIEFS for p in ("instagram", "x")
+        ]},
+        lambda: client.caption_batch(BRIEFS, ["instagram", "x"]),
+        lambda result: any("Book a viewing" not in c for captions in result.values() for c in captions.values()),
+    )
+
+    if failures:
+        print("\nFAIL:\n  " + "\n  ".join(failures))
+        return 1
+    print("\nOK: all structured requests build")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,12 +1,18 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from google.cloud.sql.connector import Connector, IPTypes
 from packages.common.config import DB_INSTANCE_CONN_NAME, DB_USER, DB_PASSWORD, DB_NAME
 
-connector = Connector()
+# The Cloud SQL connector, engine and session factory are created on first use
+# so routes that never touch the DB (and cold starts) don't pay for them.
+_connector = None
+_engine = None
+_session_factory = None
 
 def getconn():
-    conn = connector.connect(
+    global _connector
+    from google.cloud.sql.connector import Connector, IPTypes
+
+    if _connector is None:
+        _connector = Connector()
+    conn = _connector.connect(
         DB_INSTANCE_CONN_NAME,
         "pg8000",
         user=DB_USER,
@@ -16,8 +22,21 @@ def getconn():
     )
     return conn
 
-engine = create_engine("postgresql+pg8000://", creator=getconn, pool_pre_ping=True)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+def get_engine():
+    global _engine
+    if _engine is None:
+        from sqlalchemy import create_engine
+
+        _engine = create_engine("postgresql+pg8000://", creator=getconn, pool_pre_ping=True)
+    return _engine
+
+def SessionLocal():
+    global _session_factory
+    if _session_factory is None:
+        from sqlalchemy.orm import sessionmaker
+
+        _session_factory = sessionmaker(autocommit=False, autoflush=False, bind=get_engine())
+    return _session_factory()
 
 def get_db():
     db = SessionLocal()
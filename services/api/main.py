@@ -1,7 +1,10 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from services.api.routers import health, uploads, jobs, stripe_webhooks, nlp
-from packages.common.logging import get_logger
+from services.api.routers import admin, health, uploads, jobs, stripe_webhooks, nlp, usage
+from packages.common import deadline, fetch, metrics, timing, tracing
+from packages.common.config import API_REQUEST_BUDGET_SECONDS
+from packages.common.logging import get_logger, log_context, span
+from services.worker.ai import usage as ai_usage
 import os
 
 app = FastAPI(title="recontent API")
@@ -32,8 +35,44 @@ app.add_middleware(
 )
 
 
+@app.middleware("http")
+async def request_deadline(request: Request, call_next):
+	# Every model call made while serving this request shares one time budget
+	# and is accounted against the route that triggered it
+	with deadline.budget(API_REQUEST_BUDGET_SECONDS, until=deadline.from_headers(request.headers)):
+		with ai_usage.tagged(route=request.url.path), log_context(route=request.url.path):
+			with timing.collect() as timings, metrics.in_flight("api"), tracing.span(
+				f"{request.method} {request.url.path}", kind="server", context=tracing.extract(request.headers),
+				**{"http.request.method": request.method, "url.path": request.url.path},
+			):
+				with span("request", log, method=request.method) as attrs:
+					response = await call_next(request)
+					attrs["status"] = response.status_code
+				route = getattr(request.scope.get("route"), "path", "unmatched")
+				tracing.annotate(**{"http.route": route, "http.response.status_code": response.status_code})
+				metrics.observe_request("api", route, request.method, response.status_code, timings["request"][1])
+				response.headers["Server-Timing"] = timing.server_timing(timings)
+				return response
+
+
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+	rendered = metrics.render()
+	if rendered is None:
+		raise HTTPException(501, "Metrics are disabled")
+	body, content_type = rendered
+	return Response(body, media_type=content_type)
+
+
+@app.on_event("shutdown")
+async def close_http_pool():
+	await fetch.aclose()
+
+
 app.include_router(health.router, tags=["system"])
 app.include_router(uploads.router, prefix="/assets", tags=["assets"])
 app.include_router(jobs.router, tags=["jobs"])
 app.include_router(stripe_webhooks.router, tags=["billing"])
 app.include_router(nlp.router, prefix="/nlp", tags=["nlp"])
+app.include_router(usage.router, prefix="/usage", tags=["usage"])
+app.include_router(admin.router, prefix="/admin", tags=["admin"], include_in_schema=False)
@@ -0,0 +1,47 @@
+import asyncio
+import hmac
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+
+from packages.common import profiling
+from packages.common.config import ADMIN_TOKEN
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    if not ADMIN_TOKEN:
+        raise HTTPException(404, "Not Found")  # surface is off unless a token is configured
+    if not x_admin_token or not hmac.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(403, "Admin token required")
+
+
+router = APIRouter(dependencies=[Depends(require_admin)])
+
+
+@router.get("/profile/cpu", response_class=PlainTextResponse)
+async def profile_cpu(seconds: float = Query(10, gt=0, le=120), interval_ms: float = Query(10, ge=1, le=1000)):
+    """Sample all threads for `seconds`; folded stacks for flamegraph.pl / speedscope"""
+    try:
+        return await asyncio.to_thread(profiling.sample_cpu, seconds, interval_ms / 1000)
+    except profiling.ProfilerBusy as e:
+        raise HTTPException(409, str(e))
+
+
+@router.get("/profile/memory")
+async def profile_memory(
+    seconds: float = Query(10, ge=0, le=300),
+    top: int = Query(25, ge=1, le=500),
+    group_by: Literal["lineno", "filename", "traceback"] = "lineno",
+):
+    """tracemalloc top-N of allocations made during the next `seconds` and still alive"""
+    try:
+        return await profiling.memory_top(seconds, top, group_by)
+    except profiling.ProfilerBusy as e:
+        raise HTTPException(409, str(e))
+
+
+@router.get("/profile/stacks")
+async def profile_stacks():
+    """Current stacks of all threads and asyncio tasks"""
+    return profiling.stacks()
@@ -1,7 +1,13 @@
 from fastapi import APIRouter
+from packages.common import timing
 
 router = APIRouter()
 
 @router.get("/health")
 def health():
     return {"ok": True}
+
+@router.get("/health/timings")
+def timings():
+    """Per-stage latency totals for this instance since start-up"""
+    return timing.summary()
@@ -1,18 +1,104 @@
-from fastapi import APIRouter, HTTPException
-from google.cloud import pubsub_v1
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from fastapi import APIRouter, Depends, HTTPException
 from google.auth.exceptions import DefaultCredentialsError
 import json
-from packages.common.config import PUBSUB_TOPIC_JOBS, GOOGLE_CLOUD_PROJECT
+import time
+from packages.common.config import PUBSUB_TOPIC_JOBS, GOOGLE_CLOUD_PROJECT, JOB_BUDGET_SECONDS
+from packages.common import tracing
+from packages.common.logging import get_logger
 from packages.common.schemas import CompositeJob
+from services.api.deps import SessionLocal, get_db
+
+if TYPE_CHECKING:
+    from sqlalchemy.orm import Session
 
 router = APIRouter()
+log = get_logger("jobs")
+
+_publisher = None
+
+def publisher_client():
+    global _publisher
+    if not _publisher:
+        from google.cloud import pubsub_v1  # deferred: keeps pubsub/grpc off the cold-start path
+        _publisher = pubsub_v1.PublisherClient()
+    return _publisher
+
+def publish(message: dict) -> None:
+    """Queue a worker message; the absolute deadline travels with it so queue time counts against it"""
+    publisher = publisher_client()
+    topic_path = publisher.topic_path(GOOGLE_CLOUD_PROJECT, PUBSUB_TOPIC_JOBS)
+    message = {**message, "deadline": time.time() + JOB_BUDGET_SECONDS}
+    with tracing.span(f"{PUBSUB_TOPIC_JOBS} publish", kind="producer", **{
+        "messaging.system": "gcp_pubsub",
+        "messaging.destination.name": PUBSUB_TOPIC_JOBS,
+        "job.type": message.get("type"),
+        "job.id": message.get("job_id"),
+    }):
+        # Trace context rides along as message attributes; the worker continues the trace
+        publisher.publish(topic_path, data=json.dumps(message).encode("utf-8"), **tracing.inject()).result()
+
+def enqueue(job_type: str, org_id: int, user_id: int, params: dict, require_row: bool = True) -> int | None:
+    """Record a queued Job row and hand it to the worker; returns the job id.
+
+    With require_row=False a DB failure is logged and the message is published
+    without a job id (the worker skips status updates), returning None.
+    """
+    from db.models import Job, JobStatus, JobType
+
+    db = SessionLocal()
+    try:
+        try:
+            job = Job(org_id=org_id, user_id=user_id, type=JobType(job_type), status=JobStatus.QUEUED, params=params)
+            with tracing.span("INSERT jobs", kind="client", **{"db.system": "postgresql"}):
+                db.add(job)
+                db.commit()
+        except Exception as e:
+            if require_row:
+                raise
+            log.warning(f"Could not record {job_type} job, publishing without a job id: {e}")
+            publish({**params, "type": job_type, "org_id": org_id, "user_id": user_id})
+            return None
+        try:
+            publish({**params, "type": job_type, "job_id": job.id, "org_id": org_id, "user_id": user_id})
+        except Exception as e:
+            job.status = JobStatus.FAILED
+            job.error = f"enqueue failed: {e}"
+            db.commit()
+            raise
+        return job.id
+    finally:
+        db.close()
 
 @router.post("/jobs/composite")
 def jobs_composite(job: CompositeJob):
     try:
-        publisher = pubsub_v1.PublisherClient()
-        topic_path = publisher.topic_path(GOOGLE_CLOUD_PROJECT, PUBSUB_TOPIC_JOBS)
-        publisher.publish(topic_path, data=json.dumps(job.model_dump()).encode("utf-8"))
-        return {"status": "queued"}
+        # Publishing doesn't depend on the DB; without a row there's just nothing to poll
+        job_id = enqueue("composite", job.org_id, job.user_id, job.model_dump(), require_row=False)
     except DefaultCredentialsError as e:
         raise HTTPException(501, f"GCP credentials not configured: {e}")
+    if job_id is None:
+        return {"status": "queued", "job_id": None}
+    return {"status": "queued", "job_id": job_id, "status_url": f"/jobs/{job_id}"}
+
+@router.get("/jobs/{job_id}")
+def job_status(job_id: int, db: Session = Depends(get_db)):
+    """Status of a queued job; `result` gains `preview_url` early and the full outputs once complete"""
+    from db.models import Job
+
+    job = db.get(Job, job_id)
+    if job is None:
+        raise HTTPException(404, "Job not found")
+    return {
+        "job_id": job.id,
+        "type": job.type.value,
+        "status": job.status.value,
+        "result": (job.params or {}).get("result"),
+        "resources": (job.params or {}).get("resources"),
+        "error": job.error,
+        "created_at": job.created_at,
+        "updated_at": job.updated_at,
+    }
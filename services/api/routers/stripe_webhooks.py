@@ -1,18 +1,22 @@
+from __future__ import annotations
+
 import os
-from typing import Optional
+from typing import TYPE_CHECKING, Optional
 
-import stripe
 from fastapi import APIRouter, Depends, HTTPException, Request
-from sqlalchemy.orm import Session
 
-from db.models import Org, Plan, User
 from packages.common.logging import get_logger
 from services.api.deps import get_db
 
+if TYPE_CHECKING:
+    from sqlalchemy.orm import Session
+
+    from db.models import Plan
+
 
 router = APIRouter()
-stripe.api_key = os.getenv("STRIPE_SECRET", "")
 log = get_logger("stripe-webhooks")
+_stripe = None
 
 
 PLAN_WEEKLY_LIMITS = {"basic": 2, "pro": 3, "premium": 5}
@@ -27,11 +31,23 @@ PRICE_TO_PLAN = {
 }
 
 
+def stripe_module():
+    """Import and configure the Stripe SDK on first use (it is slow to import)"""
+    global _stripe
+    if _stripe is None:
+        import stripe
+
+        stripe.api_key = os.getenv("STRIPE_SECRET", "")
+        _stripe = stripe
+    return _stripe
+
+
 @router.post("/webhooks/stripe")
 async def stripe_webhook(request: Request, db: Session = Depends(get_db)):
     payload = await request.body()
     sig = request.headers.get("Stripe-Signature", ".")
     endpoint_secret = os.getenv("STRIPE_WEBHOOK_SECRET", "")
+    stripe = stripe_module()
 
     try:
         event = stripe.Webhook.construct_event(payload, sig, endpoint_secret)
@@ -68,6 +84,8 @@ async def stripe_webhook(request: Request, db: Session = Depends(get_db)):
 
 
 def handle_checkout_completed(db: Session, session: dict) -> None:
+    from db.models import Org
+
     plan_key = (session.get("metadata") or {}).get("planId")
     if not plan_key:
         raise HTTPException(400, "Missing plan metadata on checkout session")
@@ -126,6 +144,8 @@ def handle_checkout_completed(db: Session, session: dict) -> None:
 
 
 def handle_subscription_updated(db: Session, subscription: dict) -> None:
+    from db.models import Org
+
     subscription_id = subscription.get("id")
     if not subscription_id:
         raise HTTPException(400, "Subscription payload missing id")
@@ -159,6 +179,8 @@ def handle_subscription_updated(db: Session, subscription: dict) -> None:
 
 
 def handle_invoice_payment_failed(db: Session, invoice: dict) -> None:
+    from db.models import Org
+
     subscription_id = invoice.get("subscription")
     if not subscription_id:
         log.warning("Invoice missing subscription id; cannot suspend org")
@@ -176,6 +198,8 @@ def handle_invoice_payment_failed(db: Session, invoice: dict) -> None:
 
 
 def plan_from_key(plan_key: str) -> Optional[Plan]:
+    from db.models import Plan
+
     try:
         return Plan(plan_key)
     except ValueError:
@@ -183,6 +207,8 @@ def plan_from_key(plan_key: str) -> Optional[Plan]:
 
 
 def ensure_user_for_org(db: Session, org_id: int, email: str) -> None:
+    from db.models import User
+
     user = db.query(User).filter(User.email == email).one_or_none()
     if user is None:
         user = User(org_id=org_id, email=email, status="active")
@@ -210,7 +236,7 @@ def determine_plan_from_subscription(subscription: dict) -> Optional[str]:
 
 def update_subscription_metadata(subscription_id: str, org_id: int, plan_key: str) -> None:
     try:
-        stripe.Subscription.modify(
+        stripe_module().Subscription.modify(
             subscription_id,
             metadata={"org_id": str(org_id), "planId": plan_key},
         )
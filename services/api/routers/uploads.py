@@ -1,15 +1,15 @@
 from fastapi import APIRouter, Query, HTTPException
-from google.cloud import storage
 from google.auth.exceptions import DefaultCredentialsError
 import uuid
 from packages.common.config import BUCKET_RAW
+from packages.common import gcs
 
 router = APIRouter()
 
 @router.get("/upload-url")
 def upload_url(org_id: int, content_type: str = Query("image/jpeg")):
     try:
-        client = storage.Client()
+        client = gcs.client()
     except DefaultCredentialsError as e:
         raise HTTPException(501, f"GCP credentials not configured: {e}")
 
@@ -28,7 +28,7 @@ def view_url(gcs_uri: str):
     if not gcs_uri.startswith("gs://"):
         raise HTTPException(400, "gcs_uri must start with gs://")
     try:
-        client = storage.Client()
+        client = gcs.client()
     except DefaultCredentialsError as e:
         raise HTTPException(501, f"GCP credentials not configured: {e}")
 
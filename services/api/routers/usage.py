@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Literal, Optional
+
+from fastapi import APIRouter, Depends
+
+from services.api.deps import get_db
+from services.worker.ai import usage
+
+if TYPE_CHECKING:
+    from sqlalchemy.orm import Session
+
+
+router = APIRouter()
+
+COUNTERS = ("calls", "errors", "input_tokens", "output_tokens", "images", "latency_ms", "cost_usd")
+
+
+@router.get("/orgs/{org_id}")
+def org_usage(
+    org_id: int,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    group_by: Literal["model", "route", "day"] = "model",
+    db: Session = Depends(get_db),
+):
+    """AI calls, tokens and estimated cost for one org (default: last 30 days)"""
+    from sqlalchemy import func
+
+    from db.models import AIUsage
+
+    until = until or datetime.utcnow()
+    since = since or until - timedelta(days=30)
+    group = {
+        "model": AIUsage.model,
+        "route": AIUsage.route,
+        "day": func.date_trunc("day", AIUsage.window_start),
+    }[group_by]
+    rows = (
+        db.query(group.label("key"), *(func.sum(getattr(AIUsage, c)).label(c) for c in COUNTERS))
+        .filter(AIUsage.org_id == org_id, AIUsage.window_start >= since, AIUsage.window_start < until)
+        .group_by(group)
+        .order_by(group)
+        .all()
+    )
+    groups = [
+        {group_by: row.key.isoformat() if group_by == "day" else row.key, **{c: getattr(row, c) or 0 for c in COUNTERS}}
+        for row in rows
+    ]
+    totals = {c: sum(g[c] for g in groups) for c in COUNTERS}
+    totals["cost_usd"] = round(totals["cost_usd"], 6)
+    return {"org_id": org_id, "since": since, "until": until, "totals": totals, "groups": groups}
+
+
+@router.get("/live")
+def live_usage():
+    """This instance's totals since startup, including calls not yet flushed to the DB"""
+    return {"totals": usage.snapshot()}
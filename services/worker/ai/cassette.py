@@ -0,0 +1,185 @@
+import base64
+import json
+import os
+import threading
+import time
+from functools import wraps
+from types import SimpleNamespace
+
+from services.worker.ai.singleflight import request_key
+
+# Client methods captured on a cassette; anything else passes straight through
+RECORDED = (
+    "composite",
+    "inpaint",
+    "caption",
+    "caption_batch",
+    "analyze_editing_instruction",
+    "generate_enhanced_content",
+    "plan_smart_edit",
+    "stream_content",
+    "generate",  # raw model call used by the API; only the response text is kept
+)
+
+
+class CassetteMiss(KeyError):
+    """Replay was asked for a request that was never recorded"""
+
+
+class ReplayedError(RuntimeError):
+    """A recorded call failed; replay raises this with the original type and message"""
+
+    def __init__(self, error_type: str, message: str):
+        super().__init__(f"{error_type}: {message}")
+        self.error_type = error_type
+
+
+def _encode(value):
+    if isinstance(value, (bytes, bytearray)):
+        return {"__bytes__": base64.b64encode(bytes(value)).decode("ascii")}
+    if isinstance(value, tuple):
+        return {"__tuple__": [_encode(v) for v in value]}
+    if isinstance(value, list):
+        return [_encode(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _encode(v) for k, v in value.items()}
+    return value
+
+
+def _decode(value):
+    if isinstance(value, dict):
+        if "__bytes__" in value:
+            return base64.b64decode(value["__bytes__"])
+        if "__tuple__" in value:
+            return tuple(_decode(v) for v in value["__tuple__"])
+        return {k: _decode(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_decode(v) for v in value]
+    return value
+
+
+class Cassette:
+    """Directory of recorded client calls, one JSON file per request hash.
+
+    Each entry keeps the method name, the wall time the call took and either its
+    result or the error it raised. Streamed calls keep every item with its offset.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def _file(self, key: str) -> str:
+        return os.path.join(self.path, f"{key}.json")
+
+    def save(self, key: str, entry: dict) -> None:
+        os.makedirs(self.path, exist_ok=True)
+        tmp = f"{self._file(key)}.{threading.get_ident()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(_encode(entry), f)
+        with self._lock:
+            os.replace(tmp, self._file(key))
+
+    def load(self, key: str, method: str) -> dict:
+        try:
+            with open(self._file(key)) as f:
+                return _decode(json.load(f))
+        except FileNotFoundError:
+            raise CassetteMiss(f"no recording for {method} ({key[:12]}) in {self.path}") from None
+
+
+class RecordingAIClient:
+    """Wraps a real client and writes every call's result (or error) to a cassette"""
+
+    def __init__(self, inner, cassette: Cassette):
+        self._inner = inner
+        self.cassette = cassette
+
+    def __getattr__(self, name):
+        attr = getattr(self._inner, name)
+        if name not in RECORDED or not callable(attr):
+            return attr
+        if name == "stream_content":
+            return self._record_stream(attr)
+
+        @wraps(attr)
+        def call(*args, **kwargs):
+            key = request_key(name, args, kwargs)
+            started = time.monotonic()
+            try:
+                result = attr(*args, **kwargs)
+                saved = {"text": result.text} if name == "generate" else result
+            except Exception as e:
+                self.cassette.save(key, {
+                    "method": name,
+                    "elapsed": time.monotonic() - started,
+                    "error": {"type": type(e).__name__, "message": str(e)},
+                })
+                raise
+            self.cassette.save(key, {"method": name, "elapsed": time.monotonic() - started, "result": saved})
+            return result
+
+        return call
+
+    def _record_stream(self, attr):
+        @wraps(attr)
+        def call(*args, **kwargs):
+            key = request_key("stream_content", args, kwargs)
+            started = time.monotonic()
+            items = []
+            try:
+                for item in attr(*args, **kwargs):
+                    items.append({"at": time.monotonic() - started, "item": item})
+                    yield item
+            except Exception as e:
+                self.cassette.save(key, {
+                    "method": "stream_content",
+                    "elapsed": time.monotonic() - started,
+                    "items": items,
+                    "error": {"type": type(e).__name__, "message": str(e)},
+                })
+                raise
+            self.cassette.save(key, {"method": "stream_content", "elapsed": time.monotonic() - started, "items": items})
+
+        return call
+
+
+class ReplayAIClient:
+    """Serves recorded calls by request hash, with the recorded timing or none at all.
+
+    Needs no credentials or network. A request missing from the cassette raises
+    CassetteMiss, so a changed prompt or payload shows up as a failure, not a live call.
+    """
+
+    def __init__(self, cassette: Cassette, realtime: bool = True):
+        self.cassette = cassette
+        self.realtime = realtime
+
+    def __getattr__(self, name):
+        if name not in RECORDED:
+            raise AttributeError(name)
+        if name == "stream_content":
+            return self._replay_stream
+
+        def call(*args, **kwargs):
+            entry = self.cassette.load(request_key(name, args, kwargs), name)
+            if self.realtime:
+                time.sleep(entry["elapsed"])
+            if "error" in entry:
+                raise ReplayedError(entry["error"]["type"], entry["error"]["message"])
+            if name == "generate":
+                return SimpleNamespace(text=entry["result"]["text"], candidates=[], usage_metadata=None)
+            return entry["result"]
+
+        call.__name__ = name
+        return call
+
+    def _replay_stream(self, *args, **kwargs):
+        entry = self.cassette.load(request_key("stream_content", args, kwargs), "stream_content")
+        started = time.monotonic()
+        for recorded in entry["items"]:
+            if self.realtime:
+                time.sleep(max(0.0, recorded["at"] - (time.monotonic() - started)))
+            yield tuple(recorded["item"])
+        if "error" in entry:
+            raise ReplayedError(entry["error"]["type"], entry["error"]["message"])
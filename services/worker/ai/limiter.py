@@ -0,0 +1,252 @@
+import threading
+import time
+
+from packages.common.config import (
+    AI_LIMIT_QPM,
+    AI_LIMIT_QPM_OVERRIDES,
+    AI_LIMIT_BURST,
+    AI_LIMIT_MIN_CONCURRENCY,
+    AI_LIMIT_MAX_CONCURRENCY,
+    AI_LIMIT_LATENCY_TARGET_SECONDS,
+    AI_LIMIT_MAX_WAIT_SECONDS,
+)
+from packages.common.logging import get_logger
+
+log = get_logger("ai-limiter")
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+class QuotaWaitExceeded(RuntimeError):
+    """Raised instead of queueing when the expected wait for a model exceeds the limit"""
+
+    def __init__(self, model_id: str, expected_wait: float):
+        super().__init__(f"{model_id}: expected quota wait {expected_wait:.1f}s exceeds limit")
+        self.model_id = model_id
+        self.expected_wait = expected_wait
+
+
+def is_rate_limited(exc: BaseException) -> bool:
+    """True for 429 / RESOURCE_EXHAUSTED errors from Vertex (google.api_core or raw HTTP)"""
+    code = getattr(exc, "code", None)
+    if callable(code):  # grpc.RpcError exposes code() instead of an attribute
+        try:
+            code = code()
+        except Exception:
+            code = None
+    return code == 429 or getattr(code, "name", None) == "RESOURCE_EXHAUSTED" or type(exc).__name__ in (
+        "ResourceExhausted",
+        "TooManyRequests",
+    )
+
+
+class TokenBucket:
+    """Requests-per-second bucket. Reservations may go negative so waiters queue in FIFO order."""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def expected_wait(self) -> float:
+        with self._lock:
+            self._refill(time.monotonic())
+            return max(0.0, (1 - self._tokens) / self.rate)
+
+    def reserve(self) -> float:
+        """Take one token and return how long the caller must wait before using it"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens -= 1
+            return max(0.0, -self._tokens / self.rate)
+
+    def cancel(self) -> None:
+        with self._lock:
+            self._tokens = min(self.burst, self._tokens + 1)
+
+
+class AdaptiveConcurrency:
+    """AIMD concurrency limit: +1/limit per healthy call, halve on 429, shrink when slow."""
+
+    def __init__(self, initial: float, minimum: int, maximum: int, latency_target: float):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.latency_target = latency_target
+        self.in_flight = 0
+        self.waiting = 0
+        self.avg_latency = 0.0
+        self._cond = threading.Condition()
+
+    def expected_wait(self) -> float:
+        with self._cond:
+            return self._expected_wait_locked(self.waiting)
+
+    def _expected_wait_locked(self, ahead: int) -> float:
+        free = int(self.limit) - self.in_flight
+        if free > ahead:
+            return 0.0
+        # Each slot turns over roughly once per average call latency
+        return (ahead - free + 1) / max(1, int(self.limit)) * (self.avg_latency or self.latency_target)
+
+    def acquire(self, timeout: float) -> bool:
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            self.waiting += 1
+            try:
+                while self.in_flight >= int(self.limit):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return False
+                    self._cond.wait(remaining)
+                self.in_flight += 1
+                return True
+            finally:
+                self.waiting -= 1
+
+    def release(self, latency: float | None, throttled: bool) -> None:
+        with self._cond:
+            self.in_flight -= 1
+            if latency is not None:
+                self.avg_latency = latency if not self.avg_latency else 0.8 * self.avg_latency + 0.2 * latency
+            if throttled:
+                self.limit = max(self.minimum, self.limit / 2)
+            elif latency is not None and latency > self.latency_target:
+                self.limit = max(self.minimum, self.limit * 0.9)
+            elif latency is not None:
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            self._cond.notify_all()
+
+
+class Admission:
+    """Context manager for one admitted model call; feeds latency/429 back to the limiter"""
+
+    def __init__(self, model: "ModelLimiter", expected_wait: float):
+        self.model = model
+        self.expected_wait = expected_wait
+        self.waited = 0.0
+        self._started = None
+
+    def __enter__(self):
+        t0 = time.monotonic()
+        delay = self.model.bucket.reserve()
+        if delay:
+            time.sleep(delay)
+        if not self.model.concurrency.acquire(timeout=max(0.0, AI_LIMIT_MAX_WAIT_SECONDS - delay)):
+            self.model.bucket.cancel()
+            self.model.rejected += 1
+            raise QuotaWaitExceeded(self.model.model_id, time.monotonic() - t0)
+        self._started = time.monotonic()
+        self.waited = self._started - t0
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        throttled = exc is not None and is_rate_limited(exc)
+        # Failures other than 429 say nothing about latency, so they don't move the limit
+        latency = time.monotonic() - self._started if exc is None else None
+        self.model.concurrency.release(latency, throttled)
+        if throttled:
+            self.model.throttled += 1
+            log.warning(
+                "Vertex rate limited; reducing concurrency",
+                extra={"model_id": self.model.model_id, "limit": self.model.concurrency.limit},
+            )
+        return False
+
+
+class ModelLimiter:
+    def __init__(self, model_id: str, qpm: float):
+        self.model_id = model_id
+        self.bucket = TokenBucket(rate=qpm / 60.0, burst=AI_LIMIT_BURST)
+        self.concurrency = AdaptiveConcurrency(
+            initial=AI_LIMIT_MAX_CONCURRENCY,
+            minimum=AI_LIMIT_MIN_CONCURRENCY,
+            maximum=AI_LIMIT_MAX_CONCURRENCY,
+            latency_target=AI_LIMIT_LATENCY_TARGET_SECONDS,
+        )
+        self.admitted = 0
+        self.rejected = 0
+        self.throttled = 0
+
+    def expected_wait(self) -> float:
+        return self.bucket.expected_wait() + self.concurrency.expected_wait()
+
+
+class Limiter:
+    """Per-process admission control for model calls, one token bucket + AIMD limit per model id"""
+
+    def __init__(self, qpm: float = AI_LIMIT_QPM, overrides: dict | None = None):
+        self.qpm = qpm
+        self.overrides = overrides or {}
+        self._models = {}
+        self._lock = threading.Lock()
+
+    def model(self, model_id: str) -> ModelLimiter:
+        m = self._models.get(model_id)
+        if m is None:
+            with self._lock:
+                m = self._models.get(model_id)
+                if m is None:
+                    m = ModelLimiter(model_id, self.overrides.get(model_id, self.qpm))
+                    self._models[model_id] = m
+        return m
+
+    def expected_wait(self, model_id: str) -> float:
+        """Seconds a call to model_id issued now would expect to queue"""
+        return self.model(model_id).expected_wait()
+
+    def admit(self, model_id: str) -> Admission:
+        """Usage: `with limiter().admit(model_id) as slot: ...` (slot.waited / slot.expected_wait)"""
+        m = self.model(model_id)
+        expected = m.expected_wait()
+        if expected > AI_LIMIT_MAX_WAIT_SECONDS:
+            m.rejected += 1
+            raise QuotaWaitExceeded(model_id, expected)
+        m.admitted += 1
+        if expected >= 1:
+            log.info("Queued for model quota", extra={"model_id": model_id, "expected_wait": round(expected, 2)})
+        return Admission(m, expected)
+
+    def stats(self) -> dict:
+        out = {}
+        for model_id, m in list(self._models.items()):
+            c = m.concurrency
+            out[model_id] = {
+                "qpm": m.bucket.rate * 60,
+                "concurrency_limit": round(c.limit, 2),
+                "in_flight": c.in_flight,
+                "waiting": c.waiting,
+                "avg_latency": round(c.avg_latency, 3),
+                "expected_wait": round(m.expected_wait(), 3),
+                "admitted": m.admitted,
+                "rejected": m.rejected,
+                "throttled": m.throttled,
+            }
+        return out
+
+
+def parse_overrides(raw: str) -> dict:
+    """"model-a=300,model-b=20" -> {"model-a": 300.0, "model-b": 20.0}"""
+    out = {}
+    for item in raw.split(","):
+        if "=" in item:
+            model_id, qpm = item.split("=", 1)
+            out[model_id.strip()] = float(qpm)
+    return out
+
+
+def limiter() -> Limiter:
+    """Process-wide limiter shared by every route and job"""
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                _limiter = Limiter(AI_LIMIT_QPM, parse_overrides(AI_LIMIT_QPM_OVERRIDES))
+    return _limiter
@@ -1,5 +1,6 @@
 from PIL import Image, ImageDraw
 from io import BytesIO
+from packages.common.captions import fit_caption
 
 class MockAIClient:
     def composite(self, agent_bytes: bytes, room_bytes: bytes, brief: str) -> list[bytes]:
@@ -18,3 +19,19 @@ class MockAIClient:
     def caption(self, brief: str, staged: bool) -> str:
         disclosure = " One or more photos are virtually staged." if staged else ""
         return (brief[:120] + " — #ForSale #RealEstate #Home" + disclosure).strip()
+
+    def stream_content(self, prompt: str, composition_type: str, staged: bool,
+                       agent_info: dict = None, property_context: dict = None):
+        # Caption only; callers fill facts/CTA from the keyword helpers as in mock compose
+        words = self.caption(prompt, staged).split(" ")
+        for i, word in enumerate(words):
+            yield "caption", word if i == 0 else " " + word
+
+    def caption_batch(self, briefs: list[dict], platforms: list[str]) -> dict:
+        return {
+            b["id"]: {
+                p: fit_caption(f"[{p}] {b['brief']} — #ForSale #RealEstate #Home", p, staged=b.get("staged", False))
+                for p in platforms
+            }
+            for b in briefs
+        }
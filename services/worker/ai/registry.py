@@ -0,0 +1,114 @@
+# Process-wide AI client and model handles, created on first use and shared
+# across threads: vertexai.init runs once and each model id gets one handle.
+import threading
+
+from packages.common.config import (
+    AI_BACKEND,
+    AI_CASSETTE_MODE,
+    AI_CASSETTE_DIR,
+    AI_CASSETTE_REALTIME,
+    GOOGLE_CLOUD_PROJECT,
+    GOOGLE_CLOUD_LOCATION,
+    AI_COALESCE_ENABLED,
+)
+
+_lock = threading.RLock()
+_client = None
+_vertex_ready = False
+_models = {}
+
+
+def _init_vertex() -> None:
+    global _vertex_ready
+    if _vertex_ready:
+        return
+    import vertexai
+
+    vertexai.init(project=GOOGLE_CLOUD_PROJECT, location=GOOGLE_CLOUD_LOCATION)
+    _vertex_ready = True
+
+
+def _model(kind: str, model_id: str, factory):
+    key = (kind, model_id)
+    handle = _models.get(key)
+    if handle is not None:
+        return handle
+    with _lock:
+        handle = _models.get(key)
+        if handle is None:
+            _init_vertex()
+            handle = factory(model_id)
+            _models[key] = handle
+        return handle
+
+
+def generative_model(model_id: str):
+    """Cached Gemini `GenerativeModel` handle for model_id"""
+    def factory(mid):
+        from vertexai.preview.generative_models import GenerativeModel
+
+        return GenerativeModel(mid)
+
+    return _model("generative", model_id, factory)
+
+
+def image_generation_model(model_id: str):
+    """Cached Imagen `ImageGenerationModel` handle for model_id"""
+    def factory(mid):
+        from vertexai.preview.vision_models import ImageGenerationModel
+
+        return ImageGenerationModel.from_pretrained(mid)
+
+    return _model("image_generation", model_id, factory)
+
+
+def get_client():
+    """Shared AI client picked by AI_BACKEND: MockAIClient ("mock", the default when
+    MOCK_AI=1), SimulatedAIClient ("sim") or VertexAIClient ("vertex").
+
+    AI_CASSETTE_MODE=record writes every call to AI_CASSETTE_DIR; =replay serves
+    calls from it instead of any backend.
+
+    Unless AI_COALESCE_ENABLED=0 the client is wrapped so identical concurrent
+    calls share a single model request.
+    """
+    global _client
+    if _client is not None:
+        return _client
+    with _lock:
+        if _client is None:
+            if AI_CASSETTE_MODE == "replay":
+                from services.worker.ai.cassette import Cassette, ReplayAIClient
+
+                client = ReplayAIClient(Cassette(AI_CASSETTE_DIR), realtime=AI_CASSETTE_REALTIME)
+            elif AI_BACKEND == "mock":
+                from services.worker.ai.mock_client import MockAIClient
+
+                client = MockAIClient()
+            elif AI_BACKEND == "sim":
+                from services.worker.ai.sim_client import SimulatedAIClient
+
+                client = SimulatedAIClient()
+            else:
+                from services.worker.ai.vertex_client import VertexAIClient
+
+                client = VertexAIClient()
+            if AI_CASSETTE_MODE == "record":
+                from services.worker.ai.cassette import Cassette, RecordingAIClient
+
+                client = RecordingAIClient(client, Cassette(AI_CASSETTE_DIR))
+            if AI_COALESCE_ENABLED:
+                from services.worker.ai.singleflight import CoalescingAIClient
+
+                client = CoalescingAIClient(client)
+            _client = client
+        return _client
+
+
+def reset() -> None:
+    """Drop the cached client and model handles (e.g. after changing config in a shell)"""
+    global _client, _vertex_ready
+    with _lock:
+        _client = None
+        _vertex_ready = False
+        _models.clear()
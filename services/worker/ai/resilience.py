@@ -0,0 +1,185 @@
+import contextvars
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from packages.common import deadline
+from packages.common.config import (
+    AI_CALL_TIMEOUT_SECONDS,
+    AI_HEDGE_ENABLED,
+    AI_HEDGE_MIN_SAMPLES,
+    AI_BREAKER_FAILURE_THRESHOLD,
+    AI_BREAKER_RESET_SECONDS,
+)
+from packages.common.logging import get_logger
+from services.worker.ai.limiter import QuotaWaitExceeded
+
+log = get_logger("ai-resilience")
+
+# Model calls run here so the caller can stop waiting at its deadline. A timed-out
+# call keeps its thread until the SDK returns; the result is simply discarded.
+_executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="ai-call")
+_lock = threading.Lock()
+_breakers = {}
+_latencies = {}
+
+
+class CircuitOpenError(RuntimeError):
+    def __init__(self, model_id: str, retry_in: float):
+        super().__init__(f"{model_id} circuit open; retry in {retry_in:.0f}s")
+        self.model_id = model_id
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """Opens after N consecutive failures, then lets one probe through after a cool-down.
+
+    A probe that never reports back (released or abandoned) stops blocking the model
+    after another reset_seconds, when the next caller takes over as the probe.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, model_id: str, threshold: int, reset_seconds: float):
+        self.model_id = model_id
+        self.threshold = threshold
+        self.reset_seconds = reset_seconds
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probe_started = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self) -> None:
+        with self._lock:
+            if self.state == self.CLOSED:
+                return
+            now = time.monotonic()
+            since = self.opened_at if self.state == self.OPEN else self.probe_started
+            waited = now - since
+            if waited >= self.reset_seconds:
+                # Cool-down over (OPEN) or the previous probe went silent (HALF_OPEN)
+                self.state = self.HALF_OPEN  # this caller is the probe
+                self.probe_started = now
+                return
+            raise CircuitOpenError(self.model_id, max(0.0, self.reset_seconds - waited))
+
+    def release(self) -> None:
+        """Give back a probe that ended without saying anything about the model's health"""
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                # Back to OPEN with the cool-down already served, so the next caller probes
+                self.state = self.OPEN
+                self.opened_at = time.monotonic() - self.reset_seconds
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.threshold:
+                if self.state != self.OPEN:
+                    log.warning("Opening circuit", extra={"model_id": self.model_id, "failures": self.failures})
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+
+class LatencyWindow:
+    """Rolling window of successful call latencies for hedge thresholds"""
+
+    def __init__(self, size: int = 200):
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, q: float) -> float | None:
+        with self._lock:
+            if len(self._samples) < AI_HEDGE_MIN_SAMPLES:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def breaker(model_id: str) -> CircuitBreaker:
+    with _lock:
+        if model_id not in _breakers:
+            _breakers[model_id] = CircuitBreaker(model_id, AI_BREAKER_FAILURE_THRESHOLD, AI_BREAKER_RESET_SECONDS)
+        return _breakers[model_id]
+
+
+def latencies(model_id: str) -> LatencyWindow:
+    with _lock:
+        if model_id not in _latencies:
+            _latencies[model_id] = LatencyWindow()
+        return _latencies[model_id]
+
+
+def call(model_id: str, fn, *, hedge: bool = False, timeout: float = AI_CALL_TIMEOUT_SECONDS):
+    """Run one model call under the request deadline and the model's circuit breaker.
+
+    With hedge=True (idempotent calls only) a second attempt is started once the
+    first has run longer than the model's observed p95; whichever finishes first wins.
+    """
+    cb = breaker(model_id)
+    # Before allow(): an expired deadline must not claim (and strand) the half-open probe
+    budget = deadline.timeout_for(timeout)
+    cb.allow()
+    hedge_after = latencies(model_id).percentile(0.95) if hedge and AI_HEDGE_ENABLED else None
+
+    started = time.monotonic()
+    pending = {_executor.submit(_with_context(fn))}
+    if hedge_after is not None and hedge_after < budget:
+        done, _ = wait(pending, timeout=hedge_after)
+        if not done:
+            log.info("Hedging slow call", extra={"model_id": model_id, "after": round(hedge_after, 2)})
+            pending.add(_executor.submit(_with_context(fn)))
+
+    error = None
+    while pending:
+        left = budget - (time.monotonic() - started)
+        done, pending = wait(pending, timeout=max(0.0, left), return_when=FIRST_COMPLETED)
+        if not done:
+            break
+        for fut in done:
+            if fut.exception() is None:
+                latencies(model_id).add(time.monotonic() - started)
+                cb.record_success()
+                return fut.result()
+            error = fut.exception()
+
+    if error is None:
+        error = deadline.DeadlineExceeded(f"{model_id} call exceeded {budget:.1f}s budget")
+    # Local admission rejections say nothing about the model's health
+    if isinstance(error, QuotaWaitExceeded):
+        cb.release()
+    else:
+        cb.record_failure()
+    raise error
+
+
+def _with_context(fn):
+    # Carry contextvars (deadline, request tags) into the executor thread
+    ctx = contextvars.copy_context()
+    return lambda: ctx.run(fn)
+
+
+def queue_depth() -> int:
+    """Model calls submitted but not yet picked up by an executor thread"""
+    return _executor._work_queue.qsize()
+
+
+def stats() -> dict:
+    with _lock:
+        items = list(_breakers.items())
+    out = {}
+    for model_id, cb in items:
+        p95 = latencies(model_id).percentile(0.95)
+        out[model_id] = {"state": cb.state, "failures": cb.failures, "p95": round(p95, 3) if p95 else None}
+    return out
@@ -0,0 +1,354 @@
+import json
+import math
+import random
+import threading
+import time
+from collections import deque
+from functools import lru_cache
+from io import BytesIO
+
+from PIL import Image, ImageDraw
+
+from packages.common import deadline
+from packages.common.captions import fit_caption
+from packages.common.logging import get_logger
+from packages.common.config import (
+    AI_SIM_SEED,
+    AI_SIM_PROFILE_JSON,
+    AI_SIM_QPM,
+    AI_SIM_TIME_SCALE,
+    AI_SIM_IMAGE_SIZE,
+    GEMINI_IMAGE_MODEL_ID,
+    GEMINI_TEXT_MODEL_ID,
+    IMAGEN_EDIT_MODEL_ID,
+)
+from services.worker.ai import resilience, usage
+from services.worker.ai.limiter import limiter
+from services.worker.ai.vertex_client import VertexAIClient
+
+log = get_logger("ai-sim")
+
+# Per-operation behaviour: lognormal latency given by its median and p95 (seconds),
+# error_rate = share of 503s, throttle_rate = share of spontaneous 429s, and rough
+# output size. Override any field with AI_SIM_PROFILE_JSON='{"composite": {"p50": 30}}'.
+DEFAULT_PROFILE = {
+    "composite": {"p50": 14.0, "p95": 35.0, "error_rate": 0.03, "throttle_rate": 0.02, "images": 3},
+    "inpaint": {"p50": 9.0, "p95": 22.0, "error_rate": 0.03, "throttle_rate": 0.02, "images": 1},
+    "caption": {"p50": 1.5, "p95": 4.0, "error_rate": 0.01, "throttle_rate": 0.01, "chars": 200},
+    "analyze_editing_instruction": {"p50": 2.0, "p95": 5.0, "error_rate": 0.01, "throttle_rate": 0.01, "chars": 400},
+    "generate_enhanced_content": {"p50": 3.0, "p95": 8.0, "error_rate": 0.01, "throttle_rate": 0.01, "chars": 600},
+    "plan_smart_edit": {"p50": 3.5, "p95": 9.0, "error_rate": 0.01, "throttle_rate": 0.01, "chars": 900},
+    "caption_batch": {"p50": 6.0, "p95": 15.0, "error_rate": 0.02, "throttle_rate": 0.01, "chars": 200},
+    "stream_content": {"p50": 4.0, "p95": 10.0, "error_rate": 0.01, "throttle_rate": 0.01, "chars": 600},
+    "generate": {"p50": 2.0, "p95": 6.0, "error_rate": 0.01, "throttle_rate": 0.01, "chars": 400},
+}
+
+HASHTAGS = "#ForSale #RealEstate #Home #DreamHome #JustListed"
+FILLER = (
+    "Bright, open layout with generous natural light, quality finishes throughout and "
+    "an easy flow between living spaces, steps from parks, schools and transit."
+)
+
+
+def load_profile(raw: str = AI_SIM_PROFILE_JSON) -> dict:
+    overrides = json.loads(raw or "{}")
+    return {op: {**spec, **overrides.get(op, {})} for op, spec in DEFAULT_PROFILE.items()}
+
+
+def quota_error(message: str):
+    from google.api_core.exceptions import ResourceExhausted
+
+    return ResourceExhausted(message)
+
+
+def server_error(message: str):
+    from google.api_core.exceptions import ServiceUnavailable
+
+    return ServiceUnavailable(message)
+
+
+class SimulatedEndpoint:
+    """Server side of one model id: a per-minute quota (429 past it) plus seeded latency and faults"""
+
+    def __init__(self, model_id: str, qpm: float, rng: random.Random, lock: threading.Lock):
+        self.model_id = model_id
+        self.qpm = qpm
+        self._rng = rng
+        self._rng_lock = lock
+        self._calls = deque()
+        self._lock = threading.Lock()
+
+    def admit(self) -> None:
+        if not self.qpm:
+            return
+        now = time.monotonic()
+        with self._lock:
+            while self._calls and now - self._calls[0] >= 60:
+                self._calls.popleft()
+            if len(self._calls) >= self.qpm:
+                raise quota_error(f"429 Quota exceeded for {self.model_id} (simulated)")
+            self._calls.append(now)
+
+    def draw(self, spec: dict) -> tuple[float, str | None]:
+        """(latency seconds, fault) for one call; fault is None, "throttle" or "error" """
+        with self._rng_lock:
+            sigma = math.log(max(spec["p95"], spec["p50"]) / spec["p50"]) / 1.645
+            latency = self._rng.lognormvariate(math.log(spec["p50"]), sigma)
+            roll = self._rng.random()
+        fault = None
+        if roll < spec["throttle_rate"]:
+            fault = "throttle"
+        elif roll < spec["throttle_rate"] + spec["error_rate"]:
+            fault = "error"
+        return latency * AI_SIM_TIME_SCALE, fault
+
+
+class SimulatedAIClient:
+    """Offline stand-in for VertexAIClient with Vertex-like latency, quota and failures.
+
+    Calls go through the same limiter, deadline, circuit breaker and usage accounting
+    as the real client, and fall back the same way when a call fails, so load tests
+    in this mode exercise the real control paths. Select with AI_BACKEND=sim.
+    """
+
+    # Same keyword/template fallbacks as the real client
+    _fallback_operation_detection = VertexAIClient._fallback_operation_detection
+    _fallback_content_generation = VertexAIClient._fallback_content_generation
+
+    def __init__(self, profile: dict | None = None, seed: int = AI_SIM_SEED, qpm: float = AI_SIM_QPM):
+        self.profile = profile or load_profile()
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+        self._qpm = qpm
+        self._endpoints = {}
+        self._lock = threading.Lock()
+
+    def endpoint(self, model_id: str) -> SimulatedEndpoint:
+        with self._lock:
+            if model_id not in self._endpoints:
+                self._endpoints[model_id] = SimulatedEndpoint(model_id, self._qpm, self._rng, self._rng_lock)
+            return self._endpoints[model_id]
+
+    def _call(self, op: str, model_id: str, produce, *, idempotent: bool = False, prompt: str = ""):
+        """Run produce() as one simulated model call; returns its result"""
+        spec = self.profile[op]
+        endpoint = self.endpoint(model_id)
+
+        def attempt():
+            with limiter().admit(model_id):
+                started = time.monotonic()
+                latency, fault = endpoint.draw(spec)
+                try:
+                    endpoint.admit()
+                    if fault == "throttle":
+                        time.sleep(min(latency, 0.2 * AI_SIM_TIME_SCALE))
+                        raise quota_error(f"429 Resource exhausted for {model_id} (simulated)")
+                    time.sleep(latency)
+                    if fault == "error":
+                        raise server_error(f"503 {model_id} unavailable (simulated)")
+                    result = produce()
+                except Exception:
+                    usage.record(model_id, latency=time.monotonic() - started, ok=False)
+                    raise
+            usage.record(
+                model_id,
+                input_tokens=len(prompt) // 4,
+                output_tokens=sum(len(s) for s in _strings(result)) // 4,
+                images=sum(1 for r in (result if isinstance(result, list) else [result]) if isinstance(r, bytes)),
+                latency=time.monotonic() - started,
+            )
+            return result
+
+        return resilience.call(model_id, attempt, hedge=idempotent)
+
+    def _text(self, seed_text: str, chars: int) -> str:
+        text = " ".join(seed_text.split())
+        while len(text) < chars:
+            text = f"{text} {FILLER}"
+        return text[:chars].rsplit(" ", 1)[0]
+
+    def generate(self, model_id: str, contents, idempotent: bool = False, **kwargs) -> "SimulatedResponse":
+        """Raw generate_content stand-in: a response with .text, under the same latency and faults"""
+        prompt = " ".join(c for c in (contents if isinstance(contents, list) else [contents]) if isinstance(c, str))
+        chars = self.profile["generate"]["chars"]
+        return self._call(
+            "generate", model_id, lambda: SimulatedResponse(self._text(prompt, chars)),
+            idempotent=idempotent, prompt=prompt,
+        )
+
+    def composite(self, agent_bytes: bytes, room_bytes: bytes, brief: str) -> list[bytes]:
+        n = self.profile["composite"]["images"]
+        return self._call(
+            "composite", GEMINI_IMAGE_MODEL_ID,
+            lambda: [render(room_bytes, f"SIM COMPOSITE #{i + 1}") for i in range(n)],
+            prompt=brief,
+        )
+
+    def caption(self, brief: str, staged: bool) -> str:
+        disclosure = " One or more photos are virtually staged." if staged else ""
+        chars = self.profile["caption"]["chars"]
+        return self._call(
+            "caption", GEMINI_TEXT_MODEL_ID,
+            lambda: f"{self._text(brief, chars - len(HASHTAGS) - len(disclosure))} {HASHTAGS}{disclosure}",
+            idempotent=True, prompt=brief,
+        )
+
+    def stream_content(self, prompt: str, composition_type: str, staged: bool,
+                       agent_info: dict = None, property_context: dict = None):
+        spec = self.profile["stream_content"]
+        endpoint = self.endpoint(GEMINI_TEXT_MODEL_ID)
+        content = self._content(prompt, composition_type, staged)
+        cb = resilience.breaker(GEMINI_TEXT_MODEL_ID)
+        cb.allow()
+        started = time.monotonic()
+        try:
+            with limiter().admit(GEMINI_TEXT_MODEL_ID):
+                latency, fault = endpoint.draw(spec)
+                endpoint.admit()
+                if fault == "throttle":
+                    raise quota_error(f"429 Resource exhausted for {GEMINI_TEXT_MODEL_ID} (simulated)")
+                # ~30% of the time to first token, the rest spread over the caption words
+                time.sleep(latency * 0.3)
+                words = content["caption"].split(" ")
+                for i, word in enumerate(words):
+                    if deadline.remaining(default=1) <= 0:
+                        raise deadline.DeadlineExceeded("deadline passed while streaming copy")
+                    if fault == "error" and i == len(words) // 2:
+                        raise server_error(f"503 {GEMINI_TEXT_MODEL_ID} stream reset (simulated)")
+                    time.sleep(latency * 0.7 / len(words))
+                    yield "caption", word if i == 0 else " " + word
+        except Exception:
+            cb.record_failure()
+            usage.record(GEMINI_TEXT_MODEL_ID, latency=time.monotonic() - started, ok=False)
+            raise
+        cb.record_success()
+        usage.record(
+            GEMINI_TEXT_MODEL_ID,
+            input_tokens=len(prompt) // 4 + 200,
+            output_tokens=sum(len(s) for s in _strings(content)) // 4,
+            latency=time.monotonic() - started,
+        )
+        yield "facts", content["facts"]
+        yield "cta", content["cta"]
+
+    def caption_batch(self, briefs: list[dict], platforms: list[str]) -> dict:
+        def produce():
+            return {
+                b["id"]: {
+                    p: fit_caption(f"{self._text(b['brief'], 300)} {HASHTAGS}", p, staged=b.get("staged", False))
+                    for p in platforms
+                }
+                for b in briefs
+            }
+
+        try:
+            return self._call(
+                "caption_batch", GEMINI_TEXT_MODEL_ID, produce,
+                idempotent=True, prompt=" ".join(b["brief"] for b in briefs),
+            )
+        except Exception as e:
+            log.error("Error in batch captioning", extra={"error": str(e)})
+            return {
+                b["id"]: {
+                    p: fit_caption(b["brief"] + " #ForSale #RealEstate #Home", p, staged=b.get("staged", False))
+                    for p in platforms
+                }
+                for b in briefs
+            }
+
+    def analyze_editing_instruction(self, prompt: str, image_context: str = None) -> dict:
+        try:
+            return self._call(
+                "analyze_editing_instruction", GEMINI_TEXT_MODEL_ID,
+                lambda: {**self._fallback_operation_detection(prompt), "confidence": 0.9,
+                         "reasoning": self._text(f"Simulated analysis of: {prompt}", 160)},
+                idempotent=True, prompt=prompt,
+            )
+        except Exception as e:
+            log.error("Error in AI instruction analysis", extra={"error": str(e)})
+            return self._fallback_operation_detection(prompt)
+
+    def generate_enhanced_content(self, prompt: str, composition_type: str, operation_analysis: dict = None,
+                                  agent_info: dict = None, property_context: dict = None) -> dict:
+        staged = composition_type in ["virtual_staging", "smart_edit"] or "staging" in prompt.lower()
+        try:
+            return self._call(
+                "generate_enhanced_content", GEMINI_TEXT_MODEL_ID,
+                lambda: self._content(prompt, composition_type, staged),
+                idempotent=True, prompt=prompt,
+            )
+        except Exception as e:
+            log.error("Error in AI content generation", extra={"error": str(e)})
+            return self._fallback_content_generation(prompt, composition_type)
+
+    def plan_smart_edit(self, edit_instruction: str, prompt: str, composition_type: str, image_context: str = None,
+                        agent_info: dict = None, property_context: dict = None) -> dict:
+        def produce():
+            analysis = {**self._fallback_operation_detection(edit_instruction), "confidence": 0.9}
+            return {"analysis": analysis, "content": self._content(prompt, composition_type, True)}
+
+        try:
+            return self._call("plan_smart_edit", GEMINI_TEXT_MODEL_ID, produce, idempotent=True, prompt=prompt)
+        except Exception as e:
+            log.error("Error in combined smart edit analysis", extra={"error": str(e)})
+            return {
+                "analysis": self._fallback_operation_detection(edit_instruction),
+                "content": self._fallback_content_generation(prompt, composition_type, use_model=False),
+            }
+
+    def inpaint(self, source_image_bytes: bytes, mask_image_bytes: bytes, prompt: str) -> bytes:
+        try:
+            return self._call(
+                "inpaint", IMAGEN_EDIT_MODEL_ID,
+                lambda: render(source_image_bytes, f"SIM EDIT: {prompt[:30]}"),
+                prompt=prompt,
+            )
+        except Exception as e:
+            log.error("Error in simulated inpainting", extra={"error": str(e)})
+            return source_image_bytes
+
+    def _content(self, prompt: str, composition_type: str, staged: bool) -> dict:
+        disclosure = " One or more photos are virtually staged." if staged else ""
+        return {
+            "caption": f"{self._text(prompt, 190 - len(HASHTAGS) - len(disclosure))} {HASHTAGS}{disclosure}",
+            "facts": [self._text(f"{label}: {prompt}", 90) for label in ("Layout", "Finishes", "Location")],
+            "cta": "Book a private showing this week — message us for details!",
+        }
+
+
+class SimulatedResponse:
+    """The parts of a GenerationResponse callers of generate() read"""
+
+    def __init__(self, text: str):
+        self.text = text
+        self.candidates = []
+
+
+def _strings(value):
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, SimulatedResponse):
+        yield value.text
+    elif isinstance(value, dict):
+        for v in value.values():
+            yield from _strings(v)
+    elif isinstance(value, list):
+        for v in value:
+            yield from _strings(v)
+
+
+@lru_cache(maxsize=64)
+def render(image_bytes: bytes, label: str) -> bytes:
+    """Model-sized JPEG derived from the input; cached so the simulator itself stays cheap"""
+    try:
+        img = Image.open(BytesIO(image_bytes)).convert("RGB")
+    except Exception:
+        img = Image.new("RGB", (64, 64), (128, 128, 128))
+    width, height = AI_SIM_IMAGE_SIZE
+    img = img.resize((width, height))
+    draw = ImageDraw.Draw(img)
+    draw.rectangle([(10, 10), (360, 80)], fill=(0, 0, 0))
+    draw.text((20, 25), label, fill=(255, 255, 255))
+    out = BytesIO()
+    img.save(out, format="JPEG", quality=92)
+    return out.getvalue()
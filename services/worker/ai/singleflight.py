@@ -0,0 +1,116 @@
+import hashlib
+import json
+import threading
+from concurrent.futures import Future
+from functools import wraps
+
+
+def request_key(method: str, args: tuple, kwargs: dict) -> str:
+    """Stable key for a client call; bytes are hashed rather than serialized"""
+    h = hashlib.sha256(method.encode("utf-8"))
+
+    def feed(value):
+        if isinstance(value, (bytes, bytearray, memoryview)):
+            h.update(b"b")
+            h.update(hashlib.sha256(value).digest())
+        else:
+            h.update(b"j")
+            h.update(json.dumps(value, sort_keys=True, default=str).encode("utf-8"))
+
+    for arg in args:
+        feed(arg)
+    for name in sorted(kwargs):
+        h.update(name.encode("utf-8"))
+        feed(kwargs[name])
+    return h.hexdigest()
+
+
+class SingleFlight:
+    """Collapse concurrent calls with the same key into one execution.
+
+    The first caller (the leader) runs the function; callers arriving while it
+    is in flight block on the leader's future and receive the same result or
+    exception. Nothing is cached once the call completes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._inflight = {}  # key -> Future
+        self._stats = {}  # method -> {"calls", "executed", "coalesced"}
+
+    def do(self, key: str, fn, *args, method: str = "call", **kwargs):
+        with self._lock:
+            stats = self._stats.setdefault(method, {"calls": 0, "executed": 0, "coalesced": 0})
+            stats["calls"] += 1
+            fut = self._inflight.get(key)
+            leader = fut is None
+            if leader:
+                fut = Future()
+                self._inflight[key] = fut
+                stats["executed"] += 1
+            else:
+                stats["coalesced"] += 1
+
+        if not leader:
+            return _copy(fut.result())
+
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            fut.set_exception(e)
+            raise
+        else:
+            fut.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            per_method = {m: dict(s) for m, s in self._stats.items()}
+            in_flight = len(self._inflight)
+        totals = {k: sum(s[k] for s in per_method.values()) for k in ("calls", "executed", "coalesced")}
+        return {**totals, "in_flight": in_flight, "by_method": per_method}
+
+
+def _copy(result):
+    # Followers get their own top-level container so one caller can't mutate another's result
+    if isinstance(result, list):
+        return list(result)
+    if isinstance(result, dict):
+        return dict(result)
+    return result
+
+
+class CoalescingAIClient:
+    """Wraps an AI client so identical concurrent calls share one model request"""
+
+    COALESCED = (
+        "composite",
+        "inpaint",
+        "caption",
+        "analyze_editing_instruction",
+        "generate_enhanced_content",
+        "plan_smart_edit",
+        "caption_batch",
+    )
+
+    def __init__(self, inner, group: SingleFlight | None = None):
+        self._inner = inner
+        self.singleflight = group or SingleFlight()
+
+    def __getattr__(self, name):
+        attr = getattr(self._inner, name)
+        if name not in self.COALESCED or not callable(attr):
+            return attr
+
+        @wraps(attr)
+        def call(*args, **kwargs):
+            key = request_key(name, args, kwargs)
+            return self.singleflight.do(key, attr, *args, method=name, **kwargs)
+
+        return call
+
+    def stats(self) -> dict:
+        return self.singleflight.stats()
@@ -0,0 +1,172 @@
+import atexit
+import contextvars
+import json
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from packages.common.config import (
+    AI_USAGE_ENABLED,
+    AI_USAGE_FLUSH_SECONDS,
+    AI_USAGE_MAX_PENDING,
+    AI_PRICING_JSON,
+)
+from packages.common import metrics
+from packages.common.logging import get_logger
+
+log = get_logger("ai-usage")
+
+# Who the current model call is for. Set by the API routes and the worker per request/job;
+# copied into executor threads along with the rest of the context.
+_tags = contextvars.ContextVar("ai_usage_tags", default={})
+
+# USD list-price estimates: per 1M input/output tokens, and per generated image.
+# Override or extend with AI_PRICING_JSON='{"model-id": {"input": .., "output": .., "image": ..}}'.
+DEFAULT_PRICING = {
+    "gemini-2.5-flash": {"input": 0.30, "output": 2.50, "image": 0.0},
+    "gemini-1.5-flash-002": {"input": 0.075, "output": 0.30, "image": 0.0},
+    "imagen-3.0-generate-001": {"input": 0.0, "output": 0.0, "image": 0.04},
+}
+PRICING = {**DEFAULT_PRICING, **json.loads(AI_PRICING_JSON or "{}")}
+
+_lock = threading.Lock()
+_pending = {}  # (org_id, job_id, route, model, minute) -> counters, not yet written to the DB
+_totals = {}  # (org_id, route, model) -> counters since process start
+_flusher = None
+
+
+def current_tags() -> dict:
+    return _tags.get()
+
+
+def set_tags(**tags) -> None:
+    """Attach org_id / job_id / route to every AI call made later in this request or job"""
+    _tags.set({**_tags.get(), **{k: v for k, v in tags.items() if v is not None}})
+
+
+@contextmanager
+def tagged(**tags):
+    token = _tags.set({**_tags.get(), **{k: v for k, v in tags.items() if v is not None}})
+    try:
+        yield
+    finally:
+        _tags.reset(token)
+
+
+def estimate_cost(model_id: str, input_tokens: int, output_tokens: int, images: int) -> float:
+    price = PRICING.get(model_id)
+    if not price:
+        return 0.0
+    return (
+        input_tokens * price.get("input", 0.0) / 1e6
+        + output_tokens * price.get("output", 0.0) / 1e6
+        + images * price.get("image", 0.0)
+    )
+
+
+def token_counts(response) -> tuple[int, int]:
+    """(input, output) tokens from a Gemini response's usage_metadata, 0s when absent"""
+    meta = getattr(response, "usage_metadata", None)
+    if meta is None:
+        return 0, 0
+    return int(getattr(meta, "prompt_token_count", 0) or 0), int(getattr(meta, "candidates_token_count", 0) or 0)
+
+
+def record(model_id: str, *, input_tokens: int = 0, output_tokens: int = 0, images: int = 0,
+           latency: float = 0.0, ok: bool = True) -> None:
+    """Account one model call against the current tags"""
+    metrics.observe_ai_call(model_id, ok, latency)
+    if not AI_USAGE_ENABLED:
+        return
+    tags = _tags.get()
+    cost = estimate_cost(model_id, input_tokens, output_tokens, images)
+    minute = int(time.time() // 60 * 60)
+    org_id, job_id, route = tags.get("org_id"), tags.get("job_id"), tags.get("route")
+    with _lock:
+        for table, key in (
+            (_pending, (org_id, job_id, route, model_id, minute)),
+            (_totals, (org_id, route, model_id)),
+        ):
+            row = table.get(key)
+            if row is None:
+                if table is _pending and len(_pending) >= AI_USAGE_MAX_PENDING:
+                    continue  # DB unreachable for a long time; totals still count it
+                row = table[key] = _empty()
+            row["calls"] += 1
+            row["errors"] += 0 if ok else 1
+            row["input_tokens"] += input_tokens
+            row["output_tokens"] += output_tokens
+            row["images"] += images
+            row["latency_ms"] += int(latency * 1000)
+            row["cost_usd"] += cost
+    _ensure_flusher()
+
+
+def _empty() -> dict:
+    return {"calls": 0, "errors": 0, "input_tokens": 0, "output_tokens": 0, "images": 0, "latency_ms": 0, "cost_usd": 0.0}
+
+
+def snapshot() -> list[dict]:
+    """In-process totals since startup, per (org, route, model)"""
+    with _lock:
+        items = list(_totals.items())
+    return [{"org_id": o, "route": r, "model": m, **dict(c)} for (o, r, m), c in items]
+
+
+def flush() -> int:
+    """Write pending aggregates to ai_usage in one transaction; returns rows written"""
+    global _pending
+    with _lock:
+        batch, _pending = _pending, {}
+    if not batch:
+        return 0
+    try:
+        from db.models import AIUsage
+        from services.api.deps import SessionLocal
+
+        db = SessionLocal()
+        try:
+            db.add_all(
+                AIUsage(
+                    org_id=org_id,
+                    job_id=job_id,
+                    route=route,
+                    model=model_id,
+                    window_start=datetime.utcfromtimestamp(minute),
+                    **counters,
+                )
+                for (org_id, job_id, route, model_id, minute), counters in batch.items()
+            )
+            db.commit()
+        finally:
+            db.close()
+        return len(batch)
+    except Exception as e:
+        log.warning("Failed to flush AI usage; will retry", extra={"rows": len(batch), "error": str(e)})
+        with _lock:
+            for key, counters in batch.items():
+                if key in _pending:
+                    for field, value in counters.items():
+                        _pending[key][field] += value
+                elif len(_pending) < AI_USAGE_MAX_PENDING:
+                    _pending[key] = counters
+        return 0
+
+
+def _ensure_flusher() -> None:
+    global _flusher
+    if _flusher is not None:
+        return
+    with _lock:
+        if _flusher is not None:
+            return
+
+        def loop():
+            while True:
+                time.sleep(AI_USAGE_FLUSH_SECONDS)
+                flush()
+
+        _flusher = threading.Thread(target=loop, name="ai-usage-flush", daemon=True)
+        _flusher.start()
+        atexit.register(flush)
@@ -1,23 +1,162 @@
 from packages.common.config import (
     GEMINI_IMAGE_MODEL_ID,
     GEMINI_TEXT_MODEL_ID,
-    GOOGLE_CLOUD_PROJECT,
-    GOOGLE_CLOUD_LOCATION,
+    IMAGEN_EDIT_MODEL_ID,
 )
-import vertexai
-from vertexai.preview.generative_models import GenerativeModel, Part
-from vertexai.preview.vision_models import ImageGenerationModel
+from packages.common import deadline, tracing
+from packages.common.cache import make_key, response_cache
+from packages.common.captions import PLATFORM_LIMITS, STAGED_DISCLOSURE, fit_caption
+from packages.common.imaging import fit_for_model, restore
+from packages.common.logging import get_logger, span
+from packages.common.schemas import BatchCaptionResult, SmartEditPlan
+from packages.common.taxonomy import classify
+from services.worker.ai.limiter import limiter
+from services.worker.ai.registry import generative_model, image_generation_model
+from services.worker.ai import resilience, usage
 import base64
+import logging
+import time
 from PIL import Image
 from io import BytesIO
 
+log = get_logger("vertex")
+
+EDIT_OPERATIONS = [
+    "remove", "replace", "modify", "enhance", "color_change",
+    "lighting_adjust", "texture_change", "style_transfer",
+]
+
+# Vertex response_schema (OpenAPI subset) mirroring packages.common.schemas.SmartEditPlan
+SMART_EDIT_RESPONSE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "analysis": {
+            "type": "object",
+            "properties": {
+                "primary_operation": {"type": "string", "enum": EDIT_OPERATIONS},
+                "target_elements": {"type": "array", "items": {"type": "string"}},
+                "parameters": {
+                    "type": "object",
+                    "properties": {
+                        "color": {"type": "string", "nullable": True},
+                        "material": {"type": "string", "nullable": True},
+                        "style": {"type": "string", "nullable": True},
+                        "intensity": {"type": "string", "enum": ["low", "medium", "high"], "nullable": True},
+                    },
+                },
+                "confidence": {"type": "number"},
+                "fallback_operation": {"type": "string", "enum": EDIT_OPERATIONS},
+                "reasoning": {"type": "string"},
+            },
+            "required": ["primary_operation", "target_elements", "confidence", "fallback_operation", "reasoning"],
+        },
+        "content": {
+            "type": "object",
+            "properties": {
+                "caption": {"type": "string"},
+                "facts": {"type": "array", "items": {"type": "string"}},
+                "cta": {"type": "string"},
+            },
+            "required": ["caption", "facts", "cta"],
+        },
+    },
+    "required": ["analysis", "content"],
+}
+
+CAPTION_BATCH_RESPONSE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "captions": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "id": {"type": "string"},
+                    "platform": {"type": "string", "enum": list(PLATFORM_LIMITS)},
+                    "caption": {"type": "string"},
+                },
+                "required": ["id", "platform", "caption"],
+            },
+        },
+    },
+    "required": ["captions"],
+}
+
+def json_config(schema: dict):
+    """GenerationConfig for a schema-constrained JSON response.
+
+    A plain generation_config dict can't carry response_schema: the SDK passes it
+    straight to the gapic GenerationConfig, which rejects lowercase OpenAPI types.
+    """
+    from vertexai.preview.generative_models import GenerationConfig
+
+    return GenerationConfig(response_mime_type="application/json", response_schema=schema)
+
+# Keyword-fallback confidence per detected operation ("modify" = nothing matched)
+OPERATION_CONFIDENCE = {"remove": 0.8, "replace": 0.7, "lighting_adjust": 0.7, "color_change": 0.7, "modify": 0.6}
+
+# Briefs per structured request; keeps each response well inside output token limits
+CAPTION_BATCH_SIZE = 15
+
+# Section separator for streamed copy: caption, then facts, then CTA
+STREAM_SECTION = "###"
+
 class VertexAIClient:
-    def __init__(self):
-        vertexai.init(project=GOOGLE_CLOUD_PROJECT, location=GOOGLE_CLOUD_LOCATION)
-        self.image_model = GenerativeModel(GEMINI_IMAGE_MODEL_ID)
-        self.text_model = GenerativeModel(GEMINI_TEXT_MODEL_ID)
+    # Model handles come from the shared registry, so every client instance
+    # (and every call) reuses the same initialized objects.
+    @property
+    def image_model(self):
+        return generative_model(GEMINI_IMAGE_MODEL_ID)
+
+    @property
+    def text_model(self):
+        return generative_model(GEMINI_TEXT_MODEL_ID)
+
+    def generate(self, model_id: str, contents, idempotent: bool = False, **kwargs):
+        """Call generate_content on model_id under the quota limiter, request deadline and
+        circuit breaker. Idempotent (text) calls may be hedged."""
+        def attempt():
+            # Accounted per attempt so hedged duplicates show up in the spend too
+            with limiter().admit(model_id), tracing.span("vertex.generate_content", kind="client", model=model_id):
+                started = time.monotonic()
+                try:
+                    resp = generative_model(model_id).generate_content(contents, **kwargs)
+                except Exception:
+                    usage.record(model_id, latency=time.monotonic() - started, ok=False)
+                    raise
+            input_tokens, output_tokens = usage.token_counts(resp)
+            usage.record(
+                model_id,
+                input_tokens=input_tokens,
+                output_tokens=output_tokens,
+                images=len(self._inline_images(resp)),
+                latency=time.monotonic() - started,
+            )
+            return resp
+
+        with span("vertex.generate", log, logging.DEBUG, model_id=model_id):
+            return resilience.call(model_id, attempt, hedge=idempotent)
+
+    @staticmethod
+    def _inline_images(resp) -> list[bytes]:
+        images = []
+        for cand in getattr(resp, "candidates", []):
+            for part in getattr(cand.content, "parts", []):
+                if getattr(part, "inline_data", None):
+                    images.append(part.inline_data.data)
+        return images
+
+    @staticmethod
+    def _image_part(image: bytes | tuple[str, str], model_id: str):
+        """(gs:// URI, content type) pairs are passed by reference; bytes are downscaled and sent inline"""
+        from vertexai.preview.generative_models import Part
 
-    def composite(self, agent_bytes: bytes, room_bytes: bytes, brief: str) -> list[bytes]:
+        if isinstance(image, tuple):
+            uri, content_type = image
+            return Part.from_uri(uri, mime_type=content_type)
+        return Part.from_data(fit_for_model(image, model_id), mime_type="image/jpeg")
+
+    def composite(self, agent_bytes: bytes | tuple[str, str], room_bytes: bytes | tuple[str, str], brief: str) -> list[bytes]:
         system = (
             "You are a professional real-estate retoucher for Ontario listings. "
             "Make realistic, non-deceptive edits only."
@@ -27,29 +166,180 @@ class VertexAIClient:
             "Preserve identity/clothing; match perspective and lighting; add soft plausible shadow. "
             "Do not alter permanent fixtures, windows, or views. No text/logos. Return 3 options."
         )
-        resp = self.image_model.generate_content(
+        resp = self.generate(
+            GEMINI_IMAGE_MODEL_ID,
             [
                 system,
                 f"Context: {brief}",
-                Part.from_data(agent_bytes, mime_type="image/jpeg"),
-                Part.from_data(room_bytes, mime_type="image/jpeg"),
+                self._image_part(agent_bytes, GEMINI_IMAGE_MODEL_ID),
+                self._image_part(room_bytes, GEMINI_IMAGE_MODEL_ID),
                 instruction,
             ],
             generation_config={"candidate_count": 3},
         )
-        images = []
-        for cand in getattr(resp, "candidates", []):
-            for part in getattr(cand.content, "parts", []):
-                if getattr(part, "inline_data", None):
-                    images.append(part.inline_data.data)
-        return images
+        return self._inline_images(resp)
 
     def caption(self, brief: str, staged: bool) -> str:
         disclosure = " One or more photos are virtually staged." if staged else ""
-        resp = self.text_model.generate_content(
-            f"Write a neutral real-estate caption (180–220 chars) with 3–5 neutral hashtags for: {brief}.{disclosure}"
+        prompt = f"Write a neutral real-estate caption (180–220 chars) with 3–5 neutral hashtags for: {brief}.{disclosure}"
+        key = make_key(GEMINI_TEXT_MODEL_ID, prompt, {"task": "caption"})
+        cached = self._cache_get(key)
+        if cached is not None:
+            return cached
+        resp = self.generate(GEMINI_TEXT_MODEL_ID, prompt, idempotent=True)
+        text = resp.text.strip()
+        self._cache_set(key, text)
+        return text
+
+    def stream_content(self, prompt: str, composition_type: str, staged: bool,
+                       agent_info: dict = None, property_context: dict = None):
+        """Stream marketing copy from one text-model call.
+
+        Yields ("caption", delta) as caption tokens arrive, then ("facts", [...]) and
+        ("cta", str) once those sections are complete.
+        """
+        context_summary = self._content_context(prompt, composition_type, None, agent_info, property_context)
+        disclosure = f' End the caption with "{STAGED_DISCLOSURE}"' if staged else ""
+        stream_prompt = f"""
+        As a professional real estate marketing expert, write social media content for this property visualization.
+        Context: {context_summary}
+        
+        Reply in plain text (no markdown, no JSON) in exactly this layout:
+        <caption: engaging, 180-220 characters, 3-5 relevant hashtags.{disclosure}>
+        {STREAM_SECTION}
+        <fact 1>
+        <fact 2>
+        <fact 3>
+        {STREAM_SECTION}
+        <one action-oriented call-to-action>
+        """
+        key = make_key(GEMINI_TEXT_MODEL_ID, stream_prompt, {"task": "stream_content"})
+        cached = self._cache_get(key)
+        if cached is not None:
+            yield "caption", cached["caption"]
+            yield "facts", cached["facts"]
+            yield "cta", cached["cta"]
+            return
+        
+        # Streaming can't go through resilience.call (tokens arrive after it returns), so the
+        # breaker, quota admission and deadline are applied around the iteration instead.
+        cb = resilience.breaker(GEMINI_TEXT_MODEL_ID)
+        cb.allow()
+        buffer = ""
+        caption_sent = 0
+        last_chunk = None
+        started = time.monotonic()
+        try:
+            with limiter().admit(GEMINI_TEXT_MODEL_ID):
+                stream = generative_model(GEMINI_TEXT_MODEL_ID).generate_content(stream_prompt, stream=True)
+                for chunk in stream:
+                    last_chunk = chunk
+                    if deadline.remaining(default=1) <= 0:
+                        raise deadline.DeadlineExceeded("deadline passed while streaming copy")
+                    buffer += getattr(chunk, "text", "") or ""
+                    # Hold back a possible partial separator at the end of the buffer
+                    caption_end = buffer.find(STREAM_SECTION)
+                    safe = caption_end if caption_end >= 0 else max(caption_sent, len(buffer) - len(STREAM_SECTION))
+                    if safe > caption_sent:
+                        yield "caption", buffer[caption_sent:safe]
+                        caption_sent = safe
+        except Exception:
+            cb.record_failure()
+            usage.record(GEMINI_TEXT_MODEL_ID, latency=time.monotonic() - started, ok=False)
+            raise
+        cb.record_success()
+        # usage_metadata on the final chunk covers the whole stream
+        input_tokens, output_tokens = usage.token_counts(last_chunk)
+        usage.record(
+            GEMINI_TEXT_MODEL_ID,
+            input_tokens=input_tokens,
+            output_tokens=output_tokens,
+            latency=time.monotonic() - started,
+        )
+        
+        raw_caption = buffer.split(STREAM_SECTION)[0]
+        if caption_sent < len(raw_caption):
+            yield "caption", raw_caption[caption_sent:]
+        sections = [s.strip() for s in buffer.split(STREAM_SECTION)]
+        facts = [line.strip("-• ").strip() for line in sections[1].splitlines() if line.strip()] if len(sections) > 1 else []
+        cta = sections[2] if len(sections) > 2 else ""
+        if facts:
+            yield "facts", facts
+        if cta:
+            yield "cta", cta
+        if sections[0] and facts and cta:
+            self._cache_set(key, {"caption": sections[0], "facts": facts, "cta": cta})
+
+    def caption_batch(self, briefs: list[dict], platforms: list[str]) -> dict:
+        """Captions for many briefs x platforms, packed into as few structured calls as possible.
+
+        briefs: [{"id", "brief", "staged"}]. Returns {brief_id: {platform: caption}}. Entries the
+        model leaves out are retried once in a follow-up batch, then filled from a template.
+        """
+        results = {b["id"]: {} for b in briefs}
+        by_id = {b["id"]: b for b in briefs}
+        pending = [(b["id"], p) for b in briefs for p in platforms]
+        
+        for attempt in range(2):
+            if not pending:
+                break
+            ids = list(dict.fromkeys(i for i, _ in pending))
+            wanted = set(pending)
+            for start in range(0, len(ids), CAPTION_BATCH_SIZE):
+                chunk = [by_id[i] for i in ids[start:start + CAPTION_BATCH_SIZE]]
+                for item in self._caption_chunk(chunk, platforms):
+                    if (item["id"], item["platform"]) in wanted and item["caption"].strip():
+                        results[item["id"]][item["platform"]] = fit_caption(
+                            item["caption"], item["platform"], staged=by_id[item["id"]].get("staged", False)
+                        )
+            pending = [(i, p) for i, p in pending if p not in results[i]]
+        
+        for brief_id, platform in pending:
+            b = by_id[brief_id]
+            results[brief_id][platform] = fit_caption(
+                b["brief"] + " #ForSale #RealEstate #Home", platform, staged=b.get("staged", False)
+            )
+        return results
+
+    def _caption_chunk(self, briefs: list[dict], platforms: list[str]) -> list[dict]:
+        lengths = "; ".join(f"{p}: {lo}-{hi} characters" for p, (lo, hi) in PLATFORM_LIMITS.items() if p in platforms)
+        lines = "\n".join(
+            f'- id={b["id"]} staged={"true" if b.get("staged") else "false"}: {b["brief"]}' for b in briefs
+        )
+        prompt = f"""
+        Write neutral, professional real-estate social captions with 3-5 neutral hashtags.
+        Write one caption for every listing photo below on every platform: {", ".join(platforms)}.
+        Target lengths: {lengths}.
+        When staged=true the caption must end with: "{STAGED_DISCLOSURE}"
+        
+        Photos:
+        {lines}
+        """
+        key = make_key(
+            GEMINI_TEXT_MODEL_ID, prompt, {"task": "caption_batch", "response_schema": CAPTION_BATCH_RESPONSE_SCHEMA}
         )
-        return resp.text.strip()
+        cached = self._cache_get(key)
+        if cached is not None:
+            return cached
+        try:
+            response = self.generate(
+                GEMINI_TEXT_MODEL_ID, prompt, idempotent=True, generation_config=json_config(CAPTION_BATCH_RESPONSE_SCHEMA),
+            )
+            items = BatchCaptionResult.model_validate_json(response.text).model_dump()["captions"]
+        except Exception as e:
+            log.error("Error in batch captioning", extra={"error": str(e)})
+            return []
+        self._cache_set(key, items)
+        return items
+
+    def _cache_get(self, key: str):
+        cache = response_cache()
+        return cache.get(key) if cache is not None else None
+
+    def _cache_set(self, key: str, value) -> None:
+        cache = response_cache()
+        if cache is not None:
+            cache.set(key, value)
     
     def analyze_editing_instruction(self, prompt: str, image_context: str = None) -> dict:
         """Analyze natural language editing instructions using AI to detect complex operations"""
@@ -83,7 +373,13 @@ class VertexAIClient:
             }}
             """
             
-            response = self.text_model.generate_content(analysis_prompt)
+            # Only validated analyses are cached, so a bad response is retried next time
+            key = make_key(GEMINI_TEXT_MODEL_ID, analysis_prompt, {"task": "analyze_editing_instruction"})
+            cached = self._cache_get(key)
+            if cached is not None:
+                return cached
+            
+            response = self.generate(GEMINI_TEXT_MODEL_ID, analysis_prompt, idempotent=True)
             
             # Parse the JSON response
             import json
@@ -93,10 +389,11 @@ class VertexAIClient:
             if not all(key in result for key in ["primary_operation", "target_elements", "confidence"]):
                 raise ValueError("Invalid analysis format returned")
                 
+            self._cache_set(key, result)
             return result
             
         except Exception as e:
-            print(f"Error in AI instruction analysis: {e}")
+            log.error("Error in AI instruction analysis", extra={"error": str(e)})
             # Fallback to basic keyword matching
             return self._fallback_operation_detection(prompt)
     
@@ -105,29 +402,7 @@ class VertexAIClient:
         """Generate personalized marketing content using AI analysis"""
         try:
             # Build context for AI content generation
-            context_parts = [
-                f"Property visualization: {prompt}",
-                f"Composition type: {composition_type}"
-            ]
-            
-            if operation_analysis:
-                context_parts.append(f"Image modifications: {operation_analysis.get('reasoning', 'Standard processing')}")
-                
-            if property_context:
-                if property_context.get('room_type'):
-                    context_parts.append(f"Room type: {property_context['room_type']}")
-                if property_context.get('style'):
-                    context_parts.append(f"Style: {property_context['style']}")
-                if property_context.get('staging_status'):
-                    context_parts.append(f"Staging: {property_context['staging_status']}")
-                    
-            if agent_info:
-                if agent_info.get('name'):
-                    context_parts.append(f"Agent: {agent_info['name']}")
-                if agent_info.get('specialization'):
-                    context_parts.append(f"Specialization: {agent_info['specialization']}")
-            
-            context_summary = ". ".join(context_parts)
+            context_summary = self._content_context(prompt, composition_type, operation_analysis, agent_info, property_context)
             
             # Generate AI-powered content
             content_prompt = f"""
@@ -152,11 +427,16 @@ class VertexAIClient:
             Return ONLY valid JSON.
             """
             
-            response = self.text_model.generate_content(content_prompt)
+            key = make_key(GEMINI_TEXT_MODEL_ID, content_prompt, {"task": "generate_enhanced_content"})
+            cached = self._cache_get(key)
+            if cached is not None:
+                return cached
+            
+            response = self.generate(GEMINI_TEXT_MODEL_ID, content_prompt, idempotent=True)
             
             # Debug: Log the raw response
             raw_response = response.text.strip()
-            print(f"Raw AI response: {raw_response[:200]}...")
+            log.debug("Raw AI response", extra={"response": raw_response[:200]})
             
             # Clean the response - remove markdown code fences if present
             cleaned_response = raw_response
@@ -168,7 +448,7 @@ class VertexAIClient:
                 cleaned_response = cleaned_response[:-3]  # Remove trailing ```
             
             cleaned_response = cleaned_response.strip()
-            print(f"Cleaned response: {cleaned_response[:200]}...")
+            log.debug("Cleaned response", extra={"response": cleaned_response[:200]})
             
             # Parse the JSON response
             import json
@@ -178,19 +458,109 @@ class VertexAIClient:
             if not all(key in result for key in ["caption", "facts", "cta"]):
                 raise ValueError("Invalid content format returned")
                 
+            self._cache_set(key, result)
             return result
             
         except Exception as e:
-            print(f"Error in AI content generation: {e}")
+            log.error("Error in AI content generation", extra={"error": str(e)})
             # Fallback to basic content generation
             return self._fallback_content_generation(prompt, composition_type)
     
-    def _fallback_content_generation(self, prompt: str, composition_type: str) -> dict:
-        """Fallback content generation using the existing caption method"""
+    def plan_smart_edit(self, edit_instruction: str, prompt: str, composition_type: str, image_context: str = None,
+                        agent_info: dict = None, property_context: dict = None) -> dict:
+        """Edit analysis and marketing copy from a single schema-constrained Gemini call.
+
+        Returns {"analysis": ..., "content": ...} shaped like analyze_editing_instruction and
+        generate_enhanced_content. A failed or invalid response falls back to keyword analysis
+        and template copy without any further model calls.
+        """
+        context_summary = self._content_context(prompt, composition_type, None, agent_info, property_context)
+        plan_prompt = f"""
+        You are a professional real estate photo editor and marketing expert.
+        
+        1. Analyze this image editing instruction: "{edit_instruction}"
+        {f"Image context: {image_context}" if image_context else ""}
+        Identify the primary operation, the target elements, operation parameters (color, material,
+        style, intensity where applicable), a 0.0-1.0 confidence for how clear the instruction is,
+        a simpler fallback operation and a brief reasoning.
+        
+        2. Write social media content for the edited property visualization.
+        Context: {context_summary}
+        - caption: engaging 180-220 characters with 3-5 relevant hashtags, lifestyle benefits and visual appeal
+        - facts: 3 specific, compelling facts relevant to the space and the edit
+        - cta: action-oriented, contextually appropriate call-to-action
+        - Include a virtual staging disclosure if furniture or decor is added
+        """
+        try:
+            key = make_key(
+                GEMINI_TEXT_MODEL_ID, plan_prompt, {"task": "plan_smart_edit", "response_schema": SMART_EDIT_RESPONSE_SCHEMA}
+            )
+            cached = self._cache_get(key)
+            if cached is not None:
+                return cached
+            
+            response = self.generate(
+                GEMINI_TEXT_MODEL_ID, plan_prompt, idempotent=True,
+                generation_config=json_config(SMART_EDIT_RESPONSE_SCHEMA),
+            )
+            plan = SmartEditPlan.model_validate_json(response.text)
+            result = plan.model_dump()
+            result["analysis"]["parameters"] = {k: v for k, v in result["analysis"]["parameters"].items() if v}
+            
+            self._cache_set(key, result)
+            return result
+            
+        except Exception as e:
+            log.error("Error in combined smart edit analysis", extra={"error": str(e)})
+            return {
+                "analysis": self._fallback_operation_detection(edit_instruction),
+                "content": self._fallback_content_generation(prompt, composition_type, use_model=False),
+            }
+    
+    @staticmethod
+    def _content_context(prompt: str, composition_type: str, operation_analysis: dict = None,
+                         agent_info: dict = None, property_context: dict = None) -> str:
+        context_parts = [
+            f"Property visualization: {prompt}",
+            f"Composition type: {composition_type}"
+        ]
+        
+        if operation_analysis:
+            context_parts.append(f"Image modifications: {operation_analysis.get('reasoning', 'Standard processing')}")
+            
+        if property_context:
+            if property_context.get('room_type'):
+                context_parts.append(f"Room type: {property_context['room_type']}")
+            if property_context.get('style'):
+                context_parts.append(f"Style: {property_context['style']}")
+            if property_context.get('staging_status'):
+                context_parts.append(f"Staging: {property_context['staging_status']}")
+                
+        if agent_info:
+            if agent_info.get('name'):
+                context_parts.append(f"Agent: {agent_info['name']}")
+            if agent_info.get('specialization'):
+                context_parts.append(f"Specialization: {agent_info['specialization']}")
+        
+        return ". ".join(context_parts)
+    
+    def _fallback_content_generation(self, prompt: str, composition_type: str, use_model: bool = True) -> dict:
+        """Fallback content generation using the existing caption method (or a template when use_model=False)"""
         staged = composition_type in ["virtual_staging", "smart_edit"] or "staging" in prompt.lower()
+        disclosure = " One or more photos are virtually staged." if staged else ""
+        caption = None
+        
+        if use_model:
+            try:
+                caption = self.caption(prompt, staged=staged)
+            except Exception as e:
+                # Text model unhealthy (circuit open / deadline): template caption, no more calls
+                log.warning("Caption fallback failed, using template", extra={"error": str(e)})
+        if caption is None:
+            caption = (prompt[:120] + " — #ForSale #RealEstate #Home" + disclosure).strip()
         
         return {
-            "caption": self.caption(prompt, staged=staged),
+            "caption": caption,
             "facts": [
                 "Prime location with excellent amenities",
                 "Move-in ready condition",
@@ -201,33 +571,11 @@ class VertexAIClient:
     
     def _fallback_operation_detection(self, prompt: str) -> dict:
         """Fallback to basic keyword matching if AI analysis fails"""
-        operation = "modify"
-        target_elements = ["object"]
-        confidence = 0.6
-        
-        # Basic keyword matching (original logic)
-        if any(word in prompt.lower() for word in ["remove", "delete", "erase"]):
-            operation = "remove"
-            confidence = 0.8
-        elif any(word in prompt.lower() for word in ["replace", "change", "swap"]):
-            operation = "replace"
-            confidence = 0.7
-        elif any(word in prompt.lower() for word in ["brighten", "darken", "lighting"]):
-            operation = "lighting_adjust"
-            confidence = 0.7
-        elif any(word in prompt.lower() for word in ["color", "paint", "recolor"]):
-            operation = "color_change"
-            confidence = 0.7
-        
-        # Basic target detection
-        if "furniture" in prompt.lower():
-            target_elements = ["furniture"]
-        elif "wall" in prompt.lower():
-            target_elements = ["wall"]
-        elif any(word in prompt.lower() for word in ["couch", "sofa"]):
-            target_elements = ["couch"]
-        elif any(word in prompt.lower() for word in ["lighting", "light"]):
-            target_elements = ["lighting"]
+        labels = classify(prompt)
+        operation = labels.first("operation", "modify")
+        confidence = OPERATION_CONFIDENCE.get(operation, 0.6)
+        target = labels.first("target")
+        target_elements = [target] if target else ["object"]
         
         return {
             "primary_operation": operation,
@@ -241,11 +589,14 @@ class VertexAIClient:
     def inpaint(self, source_image_bytes: bytes, mask_image_bytes: bytes, prompt: str) -> bytes:
         """Apply AI-powered inpainting to edit specific regions of an image"""
         try:
-            # Initialize Imagen model for inpainting
-            model = ImageGenerationModel.from_pretrained("imagen-3.0-generate-001")
+            from vertexai.preview.generative_models import Part
+
+            # Cached Imagen handle; from_pretrained only runs on the first edit
+            model = image_generation_model(IMAGEN_EDIT_MODEL_ID)
             
-            # Convert bytes to PIL Images
-            source_image = Image.open(BytesIO(source_image_bytes)).convert("RGB")
+            # Send the source at Imagen's working resolution; the result is
+            # composited back onto the full-resolution original below
+            source_image = Image.open(BytesIO(fit_for_model(source_image_bytes, IMAGEN_EDIT_MODEL_ID))).convert("RGB")
             mask_image = Image.open(BytesIO(mask_image_bytes)).convert("L")  # Grayscale for mask
             
             # Ensure images are same size
@@ -267,22 +618,39 @@ class VertexAIClient:
             Match existing lighting, perspective, and style. Professional MLS standards."""
             
             # Call Vertex AI Imagen for inpainting
-            response = model.edit_image(
-                base_image=Part.from_data(source_bytes, mime_type="image/jpeg"),
-                mask=Part.from_data(mask_bytes, mime_type="image/png"),
-                prompt=enhanced_prompt,
-                number_of_images=1
-            )
+            def attempt():
+                with limiter().admit(IMAGEN_EDIT_MODEL_ID), tracing.span(
+                    "vertex.edit_image", kind="client", model=IMAGEN_EDIT_MODEL_ID,
+                ):
+                    started = time.monotonic()
+                    try:
+                        result = model.edit_image(
+                            base_image=Part.from_data(source_bytes, mime_type="image/jpeg"),
+                            mask=Part.from_data(mask_bytes, mime_type="image/png"),
+                            prompt=enhanced_prompt,
+                            number_of_images=1
+                        )
+                    except Exception:
+                        usage.record(IMAGEN_EDIT_MODEL_ID, latency=time.monotonic() - started, ok=False)
+                        raise
+                usage.record(
+                    IMAGEN_EDIT_MODEL_ID,
+                    images=len(result.images or []),
+                    latency=time.monotonic() - started,
+                )
+                return result
+
+            response = resilience.call(IMAGEN_EDIT_MODEL_ID, attempt)
             
             # Extract the edited image
             if response.images:
                 edited_image = response.images[0]
-                return edited_image._image_bytes
+                return restore(source_image_bytes, edited_image._image_bytes, mask_image_bytes)
             else:
                 raise Exception("No edited image returned from Vertex AI")
                 
         except Exception as e:
-            print(f"Error in Vertex AI inpainting: {e}")
+            log.error("Error in Vertex AI inpainting", extra={"error": str(e)})
             # Fallback: return original image with overlay indicating edit attempt
             return self._create_fallback_edit(source_image_bytes, mask_image_bytes, prompt)
     
@@ -311,5 +679,5 @@ class VertexAIClient:
             return buffer.getvalue()
             
         except Exception as e:
-            print(f"Error creating fallback edit: {e}")
+            log.error("Error creating fallback edit", extra={"error": str(e)})
             return source_bytes
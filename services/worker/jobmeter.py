@@ -0,0 +1,104 @@
+import contextvars
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+from packages.common.config import JOB_METER_INTERVAL_MS, JOB_TRACEMALLOC
+
+# Per-job resource accounting. RSS and CPU are process-wide, so with several jobs in
+# flight each job's numbers include its neighbours' work; `concurrent_jobs` (the
+# most jobs running at once during this one) is recorded so the data can be filtered.
+# The tracemalloc peak (opt-in, JOB_TRACEMALLOC=1) is process-wide too and reset by
+# each job, so it is only recorded for jobs that ran alone.
+_current = contextvars.ContextVar("job_meter", default=None)
+_lock = threading.Lock()
+_active = set()  # Meters of running jobs, updated by the sampler thread
+_sampler = None
+
+try:
+    _PAGE = os.sysconf("SC_PAGE_SIZE")
+except (AttributeError, ValueError):
+    _PAGE = None
+
+
+def rss() -> int | None:
+    """Resident set size in bytes (Linux), or None where /proc isn't available"""
+    if _PAGE is None:
+        return None
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGE
+    except OSError:
+        return None
+
+
+class Meter:
+    __slots__ = ("rss_start", "rss_peak", "concurrent", "traced_start", "notes")
+
+    def __init__(self):
+        self.rss_start = self.rss_peak = rss()
+        self.concurrent = 1
+        self.traced_start = None
+        self.notes = {}
+
+
+def _sample() -> None:
+    while True:
+        time.sleep(JOB_METER_INTERVAL_MS / 1000)
+        current = rss()
+        with _lock:
+            for meter in _active:
+                if current is not None and (meter.rss_peak is None or current > meter.rss_peak):
+                    meter.rss_peak = current
+
+
+def _ensure_sampler() -> None:
+    global _sampler
+    if _sampler is None:
+        _sampler = threading.Thread(target=_sample, name="job-meter", daemon=True)
+        _sampler.start()
+
+
+@contextmanager
+def measure():
+    """Account the block as one job; yields the dict filled in with its usage on exit"""
+    stats = {}
+    meter = Meter()
+    with _lock:
+        _ensure_sampler()
+        _active.add(meter)
+        for other in _active:
+            other.concurrent = max(other.concurrent, len(_active))
+        if JOB_TRACEMALLOC and len(_active) == 1:
+            # Once started, tracing stays on for the life of the process
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+            meter.traced_start = tracemalloc.get_traced_memory()[0]
+    token = _current.set(meter)
+    wall, cpu = time.perf_counter(), time.process_time()
+    try:
+        yield stats
+    finally:
+        stats["wall_seconds"] = round(time.perf_counter() - wall, 3)
+        stats["cpu_seconds"] = round(time.process_time() - cpu, 3)
+        end = rss()
+        with _lock:
+            _active.discard(meter)
+        _current.reset(token)
+        if meter.rss_start is not None and end is not None:
+            stats["peak_rss_delta_bytes"] = max(meter.rss_peak or end, end) - meter.rss_start
+            stats["peak_rss_bytes"] = max(meter.rss_peak or end, end)
+        if meter.traced_start is not None and meter.concurrent == 1 and tracemalloc.is_tracing():
+            stats["tracemalloc_peak_bytes"] = tracemalloc.get_traced_memory()[1] - meter.traced_start
+        stats["concurrent_jobs"] = meter.concurrent
+        stats.update(meter.notes)
+
+
+def note(**fields) -> None:
+    """Attach job characteristics (input sizes, variant count) to the current job's usage"""
+    meter = _current.get()
+    if meter is not None:
+        meter.notes.update(fields)
@@ -0,0 +1,59 @@
+from datetime import datetime
+
+from packages.common import tracing
+from packages.common.logging import get_logger
+
+log = get_logger("jobstate")
+
+
+def update(job_id: int | None, status: str | None = None, error: str | None = None,
+           resources: dict | None = None, **result) -> None:
+    """Set a Job row's status and merge `result` fields into params["result"].
+
+    `resources` (CPU/memory accounting from jobmeter) is stored as params["resources"].
+
+    Messages queued without a Job row (job_id None) are ignored, and so are DB
+    errors: progress reporting must never fail the job itself.
+    """
+    if job_id is None:
+        return
+    from db.models import Job, JobStatus
+    from services.api.deps import SessionLocal
+
+    db = SessionLocal()
+    try:
+        with tracing.span("UPDATE jobs", kind="client", **{"db.system": "postgresql", "job.id": job_id}):
+            job = db.get(Job, job_id)
+            if job is None:
+                log.warning(f"Job {job_id} not found")
+                return
+            if status is not None:
+                job.status = JobStatus(status)
+            if error is not None:
+                job.error = error
+            if result or resources:
+                params = dict(job.params or {})
+                if result:
+                    params["result"] = {**params.get("result", {}), **result}
+                if resources:
+                    params["resources"] = resources
+                job.params = params
+            job.updated_at = datetime.utcnow()
+            db.commit()
+    except Exception as e:
+        log.warning(f"Could not update job {job_id}: {e}")
+    finally:
+        db.close()
+
+
+def status(job_id: int) -> str | None:
+    from db.models import Job
+    from services.api.deps import SessionLocal
+
+    db = SessionLocal()
+    try:
+        with tracing.span("SELECT jobs", kind="client", **{"db.system": "postgresql", "job.id": job_id}):
+            job = db.get(Job, job_id)
+        return job.status.value if job else None
+    finally:
+        db.close()
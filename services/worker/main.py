@@ -1,21 +1,127 @@
-from fastapi import FastAPI, Request
+import asyncio
+import time
+from fastapi import FastAPI, HTTPException, Request, Response
+from packages.common import deadline, metrics, timing, tracing
+from packages.common.config import JOB_BUDGET_SECONDS, PUBSUB_TOPIC_JOBS
+from packages.common.gcs import get_signed_url
 from packages.common.pubsub import parse_push
-from packages.common.logging import get_logger
-from services.worker.processors import compositor, captioner
+from packages.common.logging import get_logger, log_context, span
+from services.api.routers import admin
+from services.worker import jobmeter, jobstate
+from services.worker.ai import usage
+from services.worker.processors import compositor, captioner, composer
 
 app = FastAPI(title="recontent Worker")
 log = get_logger("worker")
+app.include_router(admin.router, prefix="/admin", tags=["admin"], include_in_schema=False)
+
+@app.middleware("http")
+async def server_timing(request: Request, call_next):
+    started = time.perf_counter()
+    with timing.collect() as timings, metrics.in_flight("worker"):
+        response = await call_next(request)
+        route = getattr(request.scope.get("route"), "path", "unmatched")
+        metrics.observe_request("worker", route, request.method, response.status_code, time.perf_counter() - started)
+        response.headers["Server-Timing"] = timing.server_timing(timings)
+        return response
 
 @app.get("/health")
 def health():
     return {"ok": True}
 
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    rendered = metrics.render()
+    if rendered is None:
+        raise HTTPException(501, "Metrics are disabled")
+    body, content_type = rendered
+    return Response(body, media_type=content_type)
+
+@app.get("/health/timings")
+def timings():
+    """Per-stage latency totals for this instance since start-up"""
+    return timing.summary()
+
 @app.post("/pubsub")
 async def pubsub_push(request: Request):
     msg = await parse_push(request)
     typ = msg.get("type")
-    log.info(f"Received job type={typ}")
-    if typ == "composite":
-        uris = compositor.run(msg)
-        return {"status": "ok", "outputs": uris}
+    pubsub = request.state.pubsub
+    # Queue wait: publish (API side) to now; the span below is the processing time
+    wait_ms = None
+    if pubsub["publish_time"]:
+        queue_wait = time.time() - pubsub["publish_time"]
+        metrics.observe_queue_wait(typ, queue_wait)
+        wait_ms = round(queue_wait * 1000, 1)
+    with log_context(route=f"job:{typ}", job_id=msg.get("job_id"), org_id=msg.get("org_id")), tracing.span(
+        f"{PUBSUB_TOPIC_JOBS} process", kind="consumer", context=tracing.extract(pubsub["attributes"]), **{
+            "messaging.system": "gcp_pubsub",
+            "messaging.message.id": pubsub["message_id"],
+            "messaging.queue_wait_ms": wait_ms,
+            "job.type": typ,
+            "job.id": msg.get("job_id"),
+        },
+    ):
+        started = time.perf_counter()
+        status, resources = "error", None
+        try:
+            with span("job", log, type=typ, queue_wait_ms=wait_ms) as attrs, jobmeter.measure() as resources:
+                result = await handle(msg)
+                status = attrs["status"] = result.get("status")
+            return result
+        finally:
+            metrics.observe_job(typ, status, time.perf_counter() - started)
+            if resources:
+                metrics.observe_job_resources(typ, resources)
+                log.info("Job resources", extra={"type": typ, "status": status, **resources})
+                await asyncio.to_thread(jobstate.update, msg.get("job_id"), resources=resources)
+
+async def handle(msg: dict) -> dict:
+    typ = msg.get("type")
+    usage.set_tags(route=f"job:{typ}", org_id=msg.get("org_id"), job_id=msg.get("job_id"))
+    with deadline.budget(JOB_BUDGET_SECONDS, until=msg.get("deadline")):
+        if deadline.remaining() <= 0:
+            # Ack (2xx) so Pub/Sub stops redelivering work nobody is waiting for
+            log.warning("Dropping expired job", extra={"type": typ})
+            await asyncio.to_thread(
+                jobstate.update, msg.get("job_id"), status="failed", error="deadline expired before processing",
+            )
+            return {"status": "expired", "type": typ}
+        if typ == "composite":
+            job_id = msg.get("job_id")
+            await asyncio.to_thread(jobstate.update, job_id, status="rendering")
+
+            def on_preview(uri: str) -> None:
+                # Signed, under the same key compose jobs use, so clients can show it directly
+                jobstate.update(job_id, preview_url=get_signed_url(uri, expiration_minutes=60))
+
+            # Run in a thread so concurrent pushes don't serialize on the event loop
+            try:
+                uris = await asyncio.to_thread(compositor.run, msg, on_preview=on_preview)
+            except Exception as e:
+                # Record it for pollers, then re-raise so Pub/Sub redelivers
+                await asyncio.to_thread(jobstate.update, job_id, status="failed", error=str(e))
+                raise
+            await asyncio.to_thread(
+                jobstate.update, job_id, status="complete", outputs=uris, timings=timing.breakdown(),
+            )
+            return {"status": "ok", "outputs": uris, "timings": timing.breakdown()}
+        if typ == "caption":
+            # Pub/Sub drops the push response body; the Job row is where captions are read from
+            job_id = msg.get("job_id")
+            await asyncio.to_thread(jobstate.update, job_id, status="rendering")
+            try:
+                captions = await asyncio.to_thread(captioner.run_batch, msg["briefs"], msg.get("platforms"))
+            except ValueError as e:
+                # Bad input (unknown platform): redelivery can't fix it, so ack
+                await asyncio.to_thread(jobstate.update, job_id, status="failed", error=str(e))
+                return {"status": "failed", "error": str(e)}
+            except Exception as e:
+                await asyncio.to_thread(jobstate.update, job_id, status="failed", error=str(e))
+                raise
+            await asyncio.to_thread(jobstate.update, job_id, status="complete", captions=captions)
+            return {"status": "ok", "captions": captions}
+        if typ == "compose":
+            # Failures are recorded on the Job row and acked; the client polls /jobs/{id}
+            return await composer.run(msg)
     return {"status": "ignored", "type": typ}
@@ -1,8 +1,13 @@
-from services.worker.ai.mock_client import MockAIClient
-from services.worker.ai.vertex_client import VertexAIClient
-from packages.common.config import MOCK_AI
-
-_ai = MockAIClient() if MOCK_AI else VertexAIClient()
+from services.worker.ai.registry import get_client
+from packages.common.captions import PLATFORM_LIMITS
 
 def run(brief: str, staged: bool) -> str:
-    return _ai.caption(brief, staged)
+    return get_client().caption(brief, staged)
+
+def run_batch(briefs: list[dict], platforms: list[str] | None = None) -> dict:
+    """Captions for every brief on every platform: {brief_id: {platform: caption}}"""
+    platforms = platforms or list(PLATFORM_LIMITS)
+    unknown = sorted(set(platforms) - set(PLATFORM_LIMITS))
+    if unknown:
+        raise ValueError(f"Unknown platforms: {', '.join(unknown)}")
+    return get_client().caption_batch(briefs, platforms)
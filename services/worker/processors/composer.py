@@ -0,0 +1,543 @@
+import asyncio
+from typing import List, Optional
+from uuid import uuid4
+
+from pydantic import BaseModel
+
+from packages.common import timing
+from packages.common.config import MOCK_AI, BUCKET_PROCESSED, GEMINI_TEXT_MODEL_ID, AI_COMBINED_SMART_EDIT, PREVIEW_ENABLED
+from packages.common.fetch import fetch_image
+from packages.common.gcs import upload_bytes, get_signed_url, download_bytes
+from packages.common.imaging import preview
+from packages.common.logging import get_logger, span
+from packages.common.taxonomy import classify
+from services.worker import jobmeter, jobstate
+from services.worker.ai.registry import get_client
+
+# The /nlp/compose pipeline, shared by the API (inline and streaming requests) and
+# the worker (async compose jobs, run()).
+log = get_logger("composer")
+
+# Operation labels shown on the mock smart-edit placeholder
+MOCK_OPERATION_NAMES = {"remove": "remove", "replace": "replace", "lighting_adjust": "lighting", "color_change": "recolor"}
+
+class ComposeRequest(BaseModel):
+    prompt: str
+    user_id: Optional[int] = None
+    org_id: Optional[int] = None
+    # For agent insertion
+    agent_image_gcs: Optional[str] = None  # GCS URI like "gs://bucket/agent.jpg"
+    room_image_gcs: Optional[str] = None   # GCS URI like "gs://bucket/room.jpg"
+    composition_type: Optional[str] = "text_to_image"  # "text_to_image", "agent_insertion", "virtual_staging", "smart_edit"
+    # For smart editing with brush masks
+    mask_data: Optional[str] = None  # Base64 encoded mask image where white = edit area
+    edit_instruction: Optional[str] = None  # What to do with the masked area
+
+class ComposeResponse(BaseModel):
+    image_url: str
+    caption: str
+    facts: List[str]
+    cta: str
+
+async def run_compose(req: ComposeRequest, on_preview=None) -> ComposeResponse:
+    """The full compose pipeline (image, then copy); used inline and by the worker's compose jobs.
+
+    on_preview(url) is called with a signed URL of a small WebP as soon as a
+    generated image exists, before the full-resolution upload and the copy.
+    """
+    # Smart edits: analyze the instruction and write the copy in one structured call
+    plan = None
+    if (req.composition_type == "smart_edit" and req.room_image_gcs and req.mask_data
+            and not MOCK_AI and AI_COMBINED_SMART_EDIT):
+        edit_instruction = req.edit_instruction or req.prompt
+        plan = await asyncio.to_thread(
+            get_client().plan_smart_edit,
+            edit_instruction,
+            req.prompt,
+            req.composition_type,
+            image_context=f"Image source: {req.room_image_gcs.split('/')[-1] if '/' in req.room_image_gcs else 'external'}",
+            agent_info={"name": "Professional Agent", "specialization": infer_agent_specialization(req.prompt)},
+            property_context=extract_property_context(req.prompt, req.composition_type),
+        )
+
+    # Determine composition type and generate appropriate image
+    with span("compose.image", log, composition_type=req.composition_type):
+        image_url = await generate_image_for_request(req, plan, on_preview)
+    staged = is_staged(req)
+
+    # Generate enhanced AI-powered marketing content
+    if plan is not None:
+        # Copy already came back with the edit analysis; no further text calls
+        caption = plan["content"]["caption"]
+        facts = plan["content"]["facts"]
+        cta = plan["content"]["cta"]
+    elif not MOCK_AI:
+        try:
+            # Build property context from prompt analysis
+            property_context = extract_property_context(req.prompt, req.composition_type)
+            log.debug("Property context", extra={"property_context": property_context})
+
+            # Build agent info if available (placeholder for future user integration)
+            agent_info = {
+                "name": "Professional Agent",  # TODO: Get from user profile
+                "specialization": infer_agent_specialization(req.prompt)
+            }
+
+            # Get operation analysis for smart edits (if available from previous analysis)
+            operation_analysis = None
+            if req.composition_type == "smart_edit" and req.edit_instruction:
+                operation_analysis = {"reasoning": f"Smart editing applied: {req.edit_instruction}"}
+
+            # Generate AI-powered content (off the event loop so identical
+            # concurrent requests can be coalesced by the client)
+            with span("compose.copy", log, composition_type=req.composition_type):
+                ai_content = await asyncio.to_thread(
+                    get_client().generate_enhanced_content,
+                    req.prompt,
+                    req.composition_type,
+                    operation_analysis=operation_analysis,
+                    agent_info=agent_info,
+                    property_context=property_context
+                )
+
+            log.debug("AI content generated", extra={"ai_content": ai_content})
+            caption = ai_content["caption"]
+            facts = ai_content["facts"]
+            cta = ai_content["cta"]
+
+        except Exception as e:
+            log.exception("AI content generation failed, falling back to basic")
+            # Fallback to basic content generation
+            caption = await asyncio.to_thread(get_client().caption, req.prompt, staged)
+            facts = generate_facts_from_prompt(req.prompt)
+            cta = generate_cta_from_prompt(req.prompt)
+    else:
+        # Mock mode uses basic content generation
+        caption = await asyncio.to_thread(get_client().caption, req.prompt, staged)
+        facts = generate_facts_from_prompt(req.prompt)
+        cta = generate_cta_from_prompt(req.prompt)
+
+    return ComposeResponse(
+        image_url=image_url,
+        caption=caption,
+        facts=facts,
+        cta=cta
+    )
+
+def is_staged(req: ComposeRequest) -> bool:
+    """Whether the output needs the virtual-staging disclosure"""
+    if req.composition_type == "agent_insertion" and req.agent_image_gcs and req.room_image_gcs:
+        return False  # Agent insertion is not virtual staging
+    if req.composition_type == "virtual_staging":
+        return True
+    if req.composition_type == "smart_edit":
+        return "remove" not in req.prompt.lower()  # If removing, not staging
+    return "staging" in req.prompt.lower() or "furnished" in req.prompt.lower()
+
+async def generate_image_for_request(req: ComposeRequest, plan: dict = None, on_preview=None) -> str:
+    """Dispatch to the image generator for the request's composition type"""
+    if req.composition_type == "agent_insertion" and req.agent_image_gcs and req.room_image_gcs:
+        return await generate_agent_insertion(req.agent_image_gcs, req.room_image_gcs, req.prompt, req.org_id or 1)
+    if req.composition_type == "virtual_staging":
+        # Virtual staging: transform empty rooms into furnished spaces
+        if req.room_image_gcs:
+            return await generate_virtual_staging(req.room_image_gcs, req.prompt, req.org_id or 1)
+        return await generate_image_from_prompt(req.prompt, req.org_id or 1)
+    if req.composition_type == "smart_edit":
+        # Smart editing: use brush masks + NLP for precise editing
+        if req.room_image_gcs and req.mask_data:
+            return await generate_smart_edit(
+                req.room_image_gcs, req.mask_data, req.edit_instruction or req.prompt, req.org_id or 1,
+                operation_analysis=plan["analysis"] if plan else None, on_preview=on_preview,
+            )
+        return await generate_image_from_prompt(req.prompt, req.org_id or 1)
+    # Default to text-to-image generation
+    return await generate_image_from_prompt(req.prompt, req.org_id or 1)
+
+async def generate_image_from_prompt(prompt: str, org_id: int) -> str:
+    """Generate an image from a natural language prompt using Vertex AI"""
+    if MOCK_AI:
+        # Return placeholder for mock mode
+        return "https://placehold.co/600x400?text=AI+Generated+Image"
+    
+    try:
+        # Create enhanced real estate prompt for image generation
+        real_estate_prompt = f"""Professional real estate photography: {prompt}. 
+        High quality, well-lit, bright and inviting interior/exterior photograph. 
+        Professional photography style, 4K resolution, perfect lighting, 
+        suitable for luxury real estate marketing materials."""
+        
+        # Use Vertex AI's text model to generate image
+        # Note: This is a simplified approach - in production you'd use Imagen
+        # Off the event loop: the limiter and deadline waits inside generate() block
+        response = await asyncio.to_thread(get_client().generate, GEMINI_TEXT_MODEL_ID, [
+            "Generate a detailed, professional description for a real estate photograph",
+            f"Based on this request: {real_estate_prompt}",
+            "Respond with only a detailed visual description suitable for image generation"
+        ])
+        
+        description = response.text.strip()
+        
+        # For now, we'll create a unique placeholder that shows we're using Vertex AI
+        # In a real implementation, this would call Imagen API
+        unique_id = str(uuid4())[:8]
+        image_url = f"https://placehold.co/800x600/4A90E2/FFFFFF?text=Vertex+AI+Generated+{unique_id}"
+        
+        # TODO: Replace with actual Imagen API call:
+        # from vertexai.preview.vision_models import ImageGenerationModel
+        # model = ImageGenerationModel.from_pretrained("imagen-3.0-generate-001")
+        # images = model.generate_images(prompt=real_estate_prompt, number_of_images=1)
+        # Upload generated image to GCS and return public URL
+        
+        return image_url
+        
+    except Exception as e:
+        log.error("Error generating image with Vertex AI", extra={"error": str(e)})
+        # Fallback to enhanced placeholder
+        return f"https://placehold.co/600x400/E74C3C/FFFFFF?text=AI+Error+{str(e)[:20]}"
+
+async def generate_agent_insertion(agent_gcs: str, room_gcs: str, prompt: str, org_id: int) -> str:
+    """Composite a real estate agent into a property photo using Vertex AI"""
+    try:
+        # For now, create a demonstration placeholder that shows agent insertion is working
+        # In production, this would use Vertex AI Imagen for real composition
+        
+        unique_id = str(uuid4())[:8]
+        
+        # Create a descriptive placeholder that shows the concept
+        demo_url = f"https://placehold.co/800x600/2ECC71/FFFFFF?text=Agent+Insertion+{unique_id}+%0AAgent:%20{agent_gcs.split('/')[-1][:8]}+%0ARoom:%20{room_gcs.split('/')[-1][:8]}"
+        
+        # TODO: Implement real Vertex AI Imagen composition
+        # agent_bytes = download_bytes(agent_gcs)  
+        # room_bytes = download_bytes(room_gcs)
+        # composite_images = get_client().composite(agent_bytes, room_bytes, enhanced_prompt)
+        # Upload result to GCS and return signed URL
+        
+        return demo_url
+            
+    except Exception as e:
+        log.error("Error in agent insertion", extra={"error": str(e)})
+        return f"https://placehold.co/600x400/E74C3C/FFFFFF?text=Insertion+Error+{str(e)[:10]}"
+
+async def generate_virtual_staging(room_gcs: str, prompt: str, org_id: int) -> str:
+    """Transform empty rooms into beautifully staged spaces using AI"""
+    try:
+        unique_id = str(uuid4())[:8]
+        
+        # Parse staging style and room type from prompt
+        labels = classify(prompt)
+        staging_style = next(
+            (s for s in ("scandinavian", "traditional", "contemporary", "minimalist") if labels.has("named_style", s)),
+            "modern",
+        )
+        room_type = next(
+            (r for r in ("kitchen", "bedroom", "dining room", "office") if labels.has("named_room", r)),
+            "living room",
+        )
+        
+        # Create demonstration URL showing staging details
+        demo_url = f"https://placehold.co/800x600/3498DB/FFFFFF?text=Virtual+Staging+{unique_id}+%0AStyle:%20{staging_style.title()}+%0ARoom:%20{room_type.title()}+%0ASource:%20{room_gcs.split('/')[-1][:12]}"
+        
+        # TODO: Implement real Imagen inpainting for virtual staging
+        # This would involve:
+        # 1. Download empty room image from GCS
+        # 2. Use Vertex AI Imagen for inpainting/furniture placement
+        # 3. Apply staging style prompts based on instructions.md
+        # 4. Upload staged result to GCS and return signed URL
+        
+        # Placeholder implementation:
+        # room_bytes = download_bytes(room_gcs)
+        # staging_prompt = f"Transform this {room_type} with {staging_style} furniture and decor. {prompt}"
+        # staged_images = await stage_room_with_ai(room_bytes, staging_prompt)
+        # return upload_and_get_signed_url(staged_images[0], org_id)
+        
+        return demo_url
+        
+    except Exception as e:
+        log.error("Error in virtual staging", extra={"error": str(e)})
+        return f"https://placehold.co/600x400/E67E22/FFFFFF?text=Staging+Error+{str(e)[:10]}"
+
+async def generate_smart_edit(image_gcs: str, mask_data: str, edit_instruction: str, org_id: int,
+                              operation_analysis: dict = None, on_preview=None) -> str:
+    """Apply intelligent editing to specific areas using brush masks and AI-powered NLP instructions.
+
+    Pass operation_analysis (e.g. from plan_smart_edit) to skip the separate analysis call.
+    """
+    try:
+        import base64
+        
+        unique_id = str(uuid4())[:8]
+        
+        # Use AI-powered operation detection instead of basic keyword matching
+        if not MOCK_AI:
+            try:
+                # Analyze the edit instruction using Vertex AI (unless the caller already did)
+                if operation_analysis is None:
+                    operation_analysis = await asyncio.to_thread(
+                        get_client().analyze_editing_instruction,
+                        edit_instruction, 
+                        image_context=f"Image source: {image_gcs.split('/')[-1] if '/' in image_gcs else 'external'}"
+                    )
+                
+                operation = operation_analysis.get("primary_operation", "modify")
+                target_elements = operation_analysis.get("target_elements", ["object"])
+                parameters = operation_analysis.get("parameters", {})
+                confidence = operation_analysis.get("confidence", 0.5)
+                reasoning = operation_analysis.get("reasoning", "AI analysis completed")
+                
+                log.info("AI operation analysis", extra={
+                    "operation": operation, "targets": target_elements, "confidence": confidence, "reasoning": reasoning,
+                })
+                
+                # Use primary target or first element
+                likely_object = target_elements[0] if target_elements else "object"
+                
+            except Exception as e:
+                log.warning("AI analysis failed, falling back to basic detection", extra={"error": str(e)})
+                # Fallback to basic keyword matching
+                labels = classify(edit_instruction)
+                operation = labels.first("operation", "modify")
+                likely_object = labels.first("target", "object")
+                confidence = 0.6 if labels.has("operation") else 0.3
+                parameters = {}
+        else:
+            # Basic fallback for mock mode
+            operation = MOCK_OPERATION_NAMES.get(classify(edit_instruction).first("operation"), "modify")
+            likely_object = "object"
+            confidence = 0.5
+            parameters = {}
+        
+        if MOCK_AI:
+            # Create enhanced demonstration URL showing AI analysis results
+            params_str = ""
+            if parameters:
+                param_parts = []
+                if "color" in parameters:
+                    param_parts.append(f"Color:{parameters['color']}")
+                if "material" in parameters:
+                    param_parts.append(f"Material:{parameters['material']}")
+                if "style" in parameters:
+                    param_parts.append(f"Style:{parameters['style']}")
+                params_str = f"+%0AParams:{'+'.join(param_parts)}" if param_parts else ""
+            
+            demo_url = f"https://placehold.co/800x600/9B59B6/FFFFFF?text=AI+Smart+Edit+{unique_id}+%0AOperation:{operation.title()}+%0ATarget:{likely_object.title()}+%0AConfidence:{confidence:.2f}{params_str}+%0ASource:{image_gcs.split('/')[-1][:12] if '/' in image_gcs else 'external'}"
+            return demo_url
+        
+        # Real AI-powered inpainting implementation
+        try:
+            # Step 1: Decode base64 mask data
+            mask_bytes = base64.b64decode(mask_data)
+            
+            # Step 2: Download source image from GCS or handle URL
+            with timing.stage("download"):
+                if image_gcs.startswith("gs://"):
+                    source_bytes = await asyncio.to_thread(download_bytes, image_gcs)
+                else:
+                    # External URLs (like Unsplash): pooled, size-guarded and cached across edits
+                    source_bytes = await fetch_image(image_gcs)
+            
+            # Step 3: Create enhanced inpainting prompt using AI analysis
+            enhanced_prompt = create_enhanced_inpainting_prompt(
+                edit_instruction, operation, likely_object, parameters
+            )
+            
+            log.debug("Enhanced inpainting prompt", extra={"prompt": enhanced_prompt})
+            
+            # Step 4: Use Vertex AI Imagen for inpainting with enhanced prompt
+            with timing.stage("model"):
+                edited_image_bytes = await asyncio.to_thread(get_client().inpaint, source_bytes, mask_bytes, enhanced_prompt)
+            
+            # Step 5: Upload result to GCS (small preview first, if anyone is waiting on it)
+            result_filename = f"smart_edit_{unique_id}_{operation}_{org_id}.jpg"
+            result_gcs_uri = f"gs://{BUCKET_PROCESSED}/org_{org_id}/{result_filename}"
+            if on_preview is not None and PREVIEW_ENABLED:
+                try:
+                    with timing.stage("preview"):
+                        preview_gcs_uri = result_gcs_uri[:-len(".jpg")] + "-preview.webp"
+                        await asyncio.to_thread(upload_bytes, preview_gcs_uri, preview(edited_image_bytes), "image/webp")
+                        preview_url = get_signed_url(preview_gcs_uri, expiration_minutes=60)
+                    await asyncio.to_thread(on_preview, preview_url)
+                except Exception as e:
+                    log.warning("Preview upload failed, continuing with full result", extra={"error": str(e)})
+            
+            with timing.stage("upload"):
+                await asyncio.to_thread(upload_bytes, result_gcs_uri, edited_image_bytes, "image/jpeg")
+            
+            # Step 6: Return signed URL for the edited image  
+            with timing.stage("sign"):
+                signed_url = get_signed_url(result_gcs_uri, expiration_minutes=60)
+            
+            return signed_url
+            
+        except Exception as e:
+            log.error("Error in real AI inpainting", extra={"error": str(e)})
+            # Fallback to demonstration URL on error
+            demo_url = f"https://placehold.co/800x600/E74C3C/FFFFFF?text=Inpaint+Error+{unique_id}+%0A{str(e)[:30]}"
+            return demo_url
+        
+    except Exception as e:
+        log.error("Error in smart editing", extra={"error": str(e)})
+        return f"https://placehold.co/600x400/E74C3C/FFFFFF?text=Edit+Error+{str(e)[:10]}"
+
+def create_enhanced_inpainting_prompt(original_instruction: str, operation: str, target_object: str, parameters: dict) -> str:
+    """Create an enhanced inpainting prompt based on AI analysis results"""
+    
+    # Base professional real estate editing prompt
+    base_prompt = "Professional real estate photography edit:"
+    
+    # Operation-specific enhancements
+    operation_prompts = {
+        "remove": f"Cleanly remove {target_object} from the scene. Fill the area naturally with appropriate background elements that match the surrounding environment.",
+        "replace": f"Replace {target_object} with a suitable alternative that fits the space and style.",
+        "color_change": f"Change the color of {target_object} while maintaining realistic lighting and shadows.",
+        "lighting_adjust": f"Adjust the lighting on {target_object} to enhance the overall scene brightness and appeal.",
+        "texture_change": f"Change the material/texture of {target_object} while preserving its form and proportions.",
+        "style_transfer": f"Transform {target_object} to match a different style while maintaining functional realism.",
+        "enhance": f"Enhance {target_object} to look more appealing and professional for real estate marketing.",
+        "modify": f"Modify {target_object} according to the specific instructions provided."
+    }
+    
+    operation_prompt = operation_prompts.get(operation, operation_prompts["modify"])
+    
+    # Add parameter-specific details
+    parameter_details = []
+    if parameters.get("color"):
+        parameter_details.append(f"Use {parameters['color']} color")
+    if parameters.get("material"):
+        parameter_details.append(f"Apply {parameters['material']} material/texture")
+    if parameters.get("style"):
+        parameter_details.append(f"Follow {parameters['style']} design style")
+    if parameters.get("intensity"):
+        intensity = parameters['intensity']
+        if intensity == "high":
+            parameter_details.append("Make the changes prominent and clearly visible")
+        elif intensity == "low":
+            parameter_details.append("Apply subtle, natural-looking changes")
+        else:  # medium
+            parameter_details.append("Apply moderate, balanced changes")
+    
+    # Combine all elements
+    enhanced_parts = [
+        base_prompt,
+        operation_prompt,
+        f"Original instruction: '{original_instruction}'",
+        ". ".join(parameter_details) if parameter_details else "",
+        "Maintain realistic lighting, perspective, and architectural accuracy.",
+        "Ensure the result looks professional and suitable for MLS listings.",
+        "High quality, natural appearance, no obvious editing artifacts."
+    ]
+    
+    # Filter out empty parts and join
+    enhanced_prompt = " ".join(part for part in enhanced_parts if part.strip())
+    
+    return enhanced_prompt
+
+ROOM_FACTS = {
+    "living room": "Spacious living room with natural light",
+    "kitchen": "Modern kitchen with updated appliances",
+    "bedroom": "Comfortable bedrooms with ample storage",
+    "bathroom": "Updated bathrooms with modern fixtures",
+    "dining room": "Elegant dining area perfect for entertaining",
+    "office": "Dedicated workspace with excellent natural light",
+}
+STYLE_FACTS = {
+    "scandinavian": "Clean lines and minimalist Nordic design aesthetic",
+    "contemporary": "Contemporary furnishings with modern appeal",
+    "traditional": "Classic traditional styling with timeless elegance",
+    "minimalist": "Minimalist design emphasizing space and light",
+}
+EDIT_FACTS = {
+    "lighting": "Optimized lighting showcases the space beautifully",
+    "remove": "Clutter-free presentation focuses on key features",
+    "color": "Updated color scheme appeals to modern buyers",
+}
+CTAS = {
+    "open_house": "Join us at the open house this weekend!",
+    "showing": "Schedule your private showing today!",
+    "tour": "Book your virtual or in-person tour now!",
+}
+
+def generate_facts_from_prompt(prompt: str) -> List[str]:
+    """Extract or generate relevant facts from the prompt"""
+    labels = classify(prompt)
+    
+    # Look for room types and add specific facts
+    facts = [ROOM_FACTS[room] for room in labels.labels("named_room")]
+    
+    # Add staging-specific facts, then the staging benefit
+    if labels.has("staging"):
+        facts.append("Professionally staged for maximum appeal")
+        style = labels.first("named_style")
+        if style:
+            facts.append(STYLE_FACTS[style])
+        facts.append("Helps buyers visualize the full potential of the space")
+    
+    # Add smart editing benefits
+    if any(labels.has("edit", word) for word in ("remove", "edit", "enhance", "improve")):
+        facts.append("Professionally enhanced to highlight property features")
+        facts.extend(EDIT_FACTS[word] for word in EDIT_FACTS if labels.has("edit", word))
+    
+    # Default facts if none found
+    if not facts:
+        facts = [
+            "Prime location with excellent amenities",
+            "Move-in ready condition"
+        ]
+    
+    return facts
+
+def generate_cta_from_prompt(prompt: str) -> str:
+    """Generate appropriate call-to-action based on prompt context"""
+    cta = classify(prompt).first("cta")
+    return CTAS[cta] if cta else "Contact us for more information and to schedule a viewing!"
+
+def extract_property_context(prompt: str, composition_type: str) -> dict:
+    """Extract property context from prompt for enhanced content generation"""
+    labels = classify(prompt)
+    context = {}
+    
+    if labels.has("room"):
+        context["room_type"] = labels.first("room")
+    if labels.has("style"):
+        context["style"] = labels.first("style")
+    
+    # Detect staging status
+    if composition_type in ["virtual_staging"] or labels.has("staging"):
+        context["staging_status"] = "virtually_staged"
+    elif composition_type == "smart_edit":
+        context["staging_status"] = "enhanced"
+    else:
+        context["staging_status"] = "as_is"
+    
+    # Detect property features
+    if labels.has("feature"):
+        context["features"] = list(labels.labels("feature"))
+    
+    return context
+
+def infer_agent_specialization(prompt: str) -> str:
+    """Infer agent specialization based on prompt content"""
+    return classify(prompt).first("specialization", "residential_specialist")
+
+async def run(msg: dict) -> dict:
+    """Run a queued /nlp/compose request and store the response on its Job row"""
+    job_id = msg["job_id"]
+    if await asyncio.to_thread(jobstate.status, job_id) in ("complete", "failed"):
+        # Pub/Sub redelivery of a job that already finished
+        return {"status": "duplicate", "job_id": job_id}
+    await asyncio.to_thread(jobstate.update, job_id, status="rendering")
+    jobmeter.note(composition_type=msg.get("composition_type"), prompt_chars=len(msg.get("prompt", "")))
+
+    def on_preview(url: str) -> None:
+        jobstate.update(job_id, preview_url=url)
+
+    try:
+        result = await run_compose(ComposeRequest(**msg), on_preview=on_preview)
+    except Exception as e:
+        log.error(f"Compose job {job_id} failed: {e}")
+        await asyncio.to_thread(jobstate.update, job_id, status="failed", error=str(e))
+        return {"status": "failed", "job_id": job_id}
+    await asyncio.to_thread(
+        jobstate.update, job_id, status="complete", timings=timing.breakdown(), **result.model_dump(),
+    )
+    return {"status": "complete", "job_id": job_id}
@@ -1,20 +1,83 @@
-from packages.common.gcs import download_bytes, upload_bytes
-from packages.common.crops import social_crops
-from services.worker.ai.mock_client import MockAIClient
-from services.worker.ai.vertex_client import VertexAIClient
-from packages.common.config import MOCK_AI, BUCKET_PROCESSED
+from packages.common.gcs import download_bytes, upload_bytes, stat
+from packages.common import timing
+from packages.common.crops import iter_social_crops
+from services.worker.ai.registry import get_client
+from packages.common.config import (
+    AI_BACKEND,
+    AI_INPUT_BY_URI,
+    AI_URI_BUCKETS,
+    AI_URI_MAX_BYTES,
+    BUCKET_PROCESSED,
+    PREVIEW_ENABLED,
+)
+from packages.common.imaging import preview
+from packages.common.logging import get_logger
+from services.worker import jobmeter
 from uuid import uuid4
 
-_ai = MockAIClient() if MOCK_AI else VertexAIClient()
+log = get_logger("compositor")
 
-def run(job: dict) -> list[str]:
-    agent = download_bytes(job["agent_gcs"])
-    room = download_bytes(job["room_gcs"])
-    variants = _ai.composite(agent, room, job.get("brief", ""))
-    uris = []
-    for img_bytes in variants:
-        for crop_bytes in social_crops(img_bytes):
-            out_uri = f"gs://{BUCKET_PROCESSED}/org{job['org_id']}/{uuid4()}.jpg"
+URI_CONTENT_TYPES = ("image/jpeg", "image/png", "image/webp")
+
+def model_input(gcs_uri: str) -> bytes | tuple[str, str]:
+    """(gs:// URI, content type) when Vertex can read the object as-is, otherwise its bytes.
+
+    The content type comes from the object's metadata: upload names always end in
+    .jpg, whatever the format, so the name can't be trusted.
+
+    Objects outside AI_URI_BUCKETS, or too large to send without downscaling first,
+    are downloaded so the client can preprocess them locally.
+    """
+    bucket = gcs_uri.replace("gs://", "").split("/", 1)[0]
+    if AI_INPUT_BY_URI and AI_BACKEND == "vertex" and bucket in AI_URI_BUCKETS.split(","):
+        meta = stat(gcs_uri)
+        if meta and meta["size"] <= AI_URI_MAX_BYTES and meta["content_type"] in URI_CONTENT_TYPES:
+            return gcs_uri, meta["content_type"]
+    return download_bytes(gcs_uri)
+
+def run(job: dict, on_preview=None) -> list[str]:
+    """Composite the agent into the room and upload social crops of every variant.
+
+    Runs as a pipeline: each crop is uploaded and dropped before the next is made,
+    and each variant is released before the next one is decoded, so peak memory is
+    one decoded variant plus one crop rather than every output at once.
+
+    on_preview(uri), if given, is called with a small WebP of the first variant
+    before any full-resolution crop is made.
+    """
+    variants = _model_variants(job)
+    if on_preview is not None and PREVIEW_ENABLED and variants:
+        try:
+            with timing.stage("preview"):
+                preview_uri = f"gs://{BUCKET_PROCESSED}/org{job['org_id']}/{uuid4()}-preview.webp"
+                upload_bytes(preview_uri, preview(variants[0]), content_type="image/webp")
+            on_preview(preview_uri)
+        except Exception as e:
+            log.warning(f"Preview failed, continuing with full outputs: {e}")
+    return list(_upload(job, _crops(variants)))
+
+def _model_variants(job: dict) -> list[bytes]:
+    # Inputs go out of scope on return, before any output is decoded
+    with timing.stage("download"):
+        agent = model_input(job["agent_gcs"])
+        room = model_input(job["room_gcs"])
+    jobmeter.note(
+        input_bytes=sum(len(x) for x in (agent, room) if isinstance(x, bytes)),
+        brief_chars=len(job.get("brief", "")),
+    )
+    with timing.stage("model"):
+        variants = get_client().composite(agent, room, job.get("brief", ""))
+    jobmeter.note(variants=len(variants), variant_bytes=sum(map(len, variants)))
+    return variants
+
+def _crops(variants: list[bytes]):
+    """Crops of every variant in order; each variant is popped (released) as it's decoded"""
+    while variants:
+        yield from iter_social_crops(variants.pop(0))
+
+def _upload(job: dict, crops):
+    for crop_bytes in crops:
+        out_uri = f"gs://{BUCKET_PROCESSED}/org{job['org_id']}/{uuid4()}.jpg"
+        with timing.stage("upload"):
             upload_bytes(out_uri, crop_bytes, content_type="image/jpeg")
-            uris.append(out_uri)
-    return uris
+        yield out_uri